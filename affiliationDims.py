@@ -0,0 +1,88 @@
+import math
+import datetime
+import numpy as np
+import pandas as pd
+from dataLoader import DEFAULT_CSV_PATH, DerivedCache, read_dataset
+
+# Account age groups as (label, minimum age in years); ages are days / 365.25,
+# grouped like pd.cut(age, [0, 1, 3, inf], right=False)
+AGE_GROUPS = [("< 1 year", 0), ("1-3 years", 1), ("> 3 years", 3)]
+DAYS_PER_YEAR = 365.25
+
+
+def as_of_days(as_of=None):
+    # Days since epoch of the date ages are measured at: a date, Timestamp or
+    # ISO string, by default today. Anything finer than a day is dropped.
+    day = pd.Timestamp(datetime.date.today() if as_of is None else as_of).normalize()
+    return (day - pd.Timestamp(0)).days
+
+
+def epoch_days(dates):
+    # Days since epoch of a datetime Series (NaN where missing)
+    return dates.dt.floor("D").sub(pd.Timestamp(0)).dt.days
+
+
+class AffiliationDays:
+    # Distinct (account, affiliation day) pairs sorted by day, with each day's
+    # affiliation year. Any as-of date and year range then selects contiguous
+    # slices of it, so age groups never rescan or re-parse the rows.
+
+    def __init__(self, df, version=None):
+        self.version = version
+        if "fecha_afiliacion" not in df.columns:
+            raise ValueError("Column 'fecha_afiliacion' not found in data.")
+        dates = df["fecha_afiliacion"]
+        accounts = df["external_account_id"]
+        valid = (dates.notna() & accounts.notna()).to_numpy()
+        days = epoch_days(dates[valid]).to_numpy(np.int64)
+        codes, uniques = pd.factorize(accounts[valid])
+        self.n_accounts = len(uniques)
+
+        first = days.min() if len(days) else 0
+        pairs = np.unique((days - first) * max(self.n_accounts, 1) + codes)
+        self.days = pairs // max(self.n_accounts, 1) + first
+        self.accounts = pairs % max(self.n_accounts, 1)
+        self.years = self.days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+
+    def year_range(self):
+        # (first, last) affiliation year
+        return int(self.years[0]), int(self.years[-1])
+
+    def age_group_counts(self, as_of=None, year_range=None):
+        # Unique accounts per age group as of `as_of`, for accounts affiliated
+        # within year_range (inclusive)
+        lo, hi = 0, len(self.days)
+        if year_range:
+            lo = np.searchsorted(self.years, year_range[0], side="left")
+            hi = np.searchsorted(self.years, year_range[1], side="right")
+
+        today = as_of_days(as_of)
+        counts = []
+        for i, (_, min_years) in enumerate(AGE_GROUPS):
+            # Age >= n years  <=>  affiliated at least ceil(n * 365.25) days before as_of
+            newest = today - math.ceil(min_years * DAYS_PER_YEAR)
+            start = lo
+            if i + 1 < len(AGE_GROUPS):
+                oldest = today - math.ceil(AGE_GROUPS[i + 1][1] * DAYS_PER_YEAR)
+                start = max(lo, np.searchsorted(self.days, oldest, side="right"))
+            stop = min(hi, np.searchsorted(self.days, newest, side="right"))
+            seen = np.zeros(self.n_accounts, dtype=bool)
+            seen[self.accounts[start:stop]] = True
+            counts.append(int(np.count_nonzero(seen)))
+
+        labels = [label for label, _ in AGE_GROUPS]
+        return pd.DataFrame({
+            "age_group": pd.Categorical(labels, categories=labels, ordered=True),
+            "account_count": np.array(counts, dtype=np.int64),
+        })
+
+
+_dims = DerivedCache("affiliation days", lambda path, fingerprint: AffiliationDays(read_dataset(path), version=fingerprint))
+
+
+def get_affiliation_days(uploaded_file=DEFAULT_CSV_PATH):
+    # Returns the dimension for a dataset path (built once per dataset
+    # version), or an ad-hoc one for an uploaded file
+    if hasattr(uploaded_file, "read"):
+        return AffiliationDays(read_dataset(uploaded_file))
+    return _dims.get(uploaded_file)
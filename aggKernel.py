@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Past this many possible key combinations the bin ids are compacted with
+# np.unique, so bincount never allocates more bins than there are rows
+DENSE_BIN_LIMIT = 1 << 22
+
+
+def encode(column):
+    # Maps a key column to dense integer codes, the number of codes and a
+    # decoder for them. Missing keys get a code of their own, like groupby(dropna=False).
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy().astype(np.int64)
+        categories = column.cat.categories
+        size = len(categories)
+        if (codes < 0).any():
+            codes = np.where(codes < 0, size, codes)
+            return codes, size + 1, lambda c: pd.Categorical.from_codes(np.where(c == size, -1, c), categories=categories)
+        return codes, size, lambda c: pd.Categorical.from_codes(c, categories=categories)
+
+    values = column.to_numpy()
+    if values.dtype.kind == "b":
+        return values.astype(np.int64), 2, lambda c: c.astype(bool)
+    if values.dtype.kind in "iu":
+        # Small integer ranges (year, month, 0/1 flags...) need no hashing at all
+        values = values.astype(np.int64)
+        low, high = values.min(), values.max()
+        if high - low < DENSE_BIN_LIMIT:
+            return values - low, int(high - low + 1), lambda c: c + low
+
+    codes, uniques = pd.factorize(column, sort=True)
+    labels = np.asarray(uniques)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels = np.append(labels.astype(object), None)
+    return codes.astype(np.int64), len(labels), labels.take
+
+
+def group_reduce(keys, values=None):
+    # Counts rows and sums each value column per observed combination of the
+    # key columns, with one np.bincount per output column.
+    # keys/values: dicts of name -> Series, all of the same length.
+    # Returns a frame indexed by the keys: an `n` column plus one sum per value.
+    values = values or {}
+    names = list(keys)
+    if not len(keys[names[0]]):
+        index = pd.MultiIndex.from_arrays([keys[name].iloc[:0] for name in names], names=names)
+        return pd.DataFrame({"n": np.zeros(0, np.int64), **{name: np.zeros(0) for name in values}}, index=index)
+
+    # Mixed-radix bin id per row; compacted whenever the id space gets too sparse
+    stages = []
+    bin_ids = np.zeros(len(keys[names[0]]), dtype=np.int64)
+    n_bins = 1
+    for name in names:
+        codes, size, decode = encode(keys[name])
+        bin_ids = bin_ids * size + codes
+        n_bins *= size
+        observed = None
+        if n_bins > DENSE_BIN_LIMIT:
+            observed, bin_ids = np.unique(bin_ids, return_inverse=True)
+            n_bins = len(observed)
+        stages.append((size, decode, observed))
+
+    counts = np.bincount(bin_ids, minlength=n_bins)
+    present = np.flatnonzero(counts)
+    sums = {
+        name: np.bincount(bin_ids, weights=np.asarray(column, dtype=np.float64), minlength=n_bins)[present]
+        for name, column in values.items()
+    }
+
+    # Labels are decoded only for the output bins, never per row
+    key_arrays = []
+    remainder = present
+    for size, decode, observed in reversed(stages):
+        if observed is not None:
+            remainder = observed[remainder]
+        key_arrays.append(decode(remainder % size))
+        remainder = remainder // size
+    index = pd.MultiIndex.from_arrays(key_arrays[::-1], names=names)
+    return pd.DataFrame({"n": counts[present], **sums}, index=index)
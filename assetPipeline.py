@@ -0,0 +1,201 @@
+import os
+import io
+import json
+import hashlib
+import logging
+import threading
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Served by Streamlit's static file serving (server.enableStaticServing) at
+# app/static/assets/...
+ASSET_DIR = os.path.join(ROOT, "static", "assets")
+ASSET_URL = "app/static/assets"
+MANIFEST_PATH = os.path.join(ASSET_DIR, "manifest.json")
+
+# Where the original images are served from until the variants are ready
+ORIGIN_URL = "https://raw.githubusercontent.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/refs/heads/main"
+
+# Bump to rebuild every variant (e.g. after changing encoder settings)
+PIPELINE_VERSION = 1
+
+# name -> (source image, widths to render). Widths above the original's are dropped.
+ASSETS = {
+    "nexus_logo": ("NEXUS.png", (60, 120, 180, 360)),
+    "team": ("img/team.png", (480, 960, 1300, 1920)),
+    "andy": ("img/Andy.jpg", (160, 327)),
+    "dany": ("img/Dany.png", (160, 330)),
+    "emi": ("img/Emi.png", (160, 326)),
+    "jorge": ("img/Jorge.png", (160, 331)),
+    "luis": ("img/Luis.png", (160, 327)),
+    "tagline": ("img/tagline.jpeg", (480, 960, 1600, 1920)),
+}
+
+# Streamlit serves .avif as text/plain, so AVIF variants are opt-in for
+# deployments whose proxy sets the content type
+BUILD_AVIF = os.environ.get("NEXUS_ASSET_AVIF", "") == "1" and features.check("avif")
+
+# Encoder settings per output format
+_ENCODERS = {
+    "avif": dict(format="AVIF", quality=55),
+    "webp": dict(format="WEBP", quality=80, method=6),
+    "jpeg": dict(format="JPEG", quality=82, optimize=True, progressive=True),
+    "png": dict(format="PNG", optimize=True),
+}
+_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+_manifest = None
+_lock = threading.Lock()
+
+
+def _source_metadata():
+    # What the variants were built from: sources, their widths and the pipeline version
+    sources = {}
+    for name, (source, widths) in ASSETS.items():
+        stat = os.stat(os.path.join(ROOT, source))
+        sources[name] = {"source": source, "widths": list(widths), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    return {"pipeline_version": PIPELINE_VERSION, "avif": BUILD_AVIF, "sources": sources}
+
+
+def _open_source(path):
+    image = Image.open(path)
+    image.load()
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        # Fully opaque alpha channels (team.png) only cost bytes
+        if image.getchannel("A").getextrema() == (255, 255):
+            image = image.convert("RGB")
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, **_ENCODERS[fmt])
+    return buffer.getvalue()
+
+
+def _write_variant(name, width, fmt, data):
+    # Content-hashed file name, written atomically; returns (file name, hash)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    extension = "jpg" if fmt == "jpeg" else fmt
+    filename = f"{name}-{width}w.{digest}.{extension}"
+    path = os.path.join(ASSET_DIR, filename)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    return filename, digest
+
+
+def build_assets():
+    # Renders every asset at each width in AVIF (opt-in), WebP and a
+    # PNG/JPEG fallback, then writes the manifest and removes stale variants
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    metadata = _source_metadata()
+    assets = {}
+    for name, (source, widths) in ASSETS.items():
+        image = _open_source(os.path.join(ROOT, source))
+        fallback = "png" if image.mode == "RGBA" else "jpeg"
+        formats = (["avif"] if BUILD_AVIF else []) + ["webp", fallback]
+        widths = sorted({min(width, image.width) for width in widths})
+        variants = {fmt: [] for fmt in formats}
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                filename, digest = _write_variant(name, width, fmt, _encode(resized, fmt))
+                variants[fmt].append({"file": filename, "width": width, "hash": digest})
+        assets[name] = {"width": image.width, "height": image.height, "fallback": fallback, "variants": variants}
+
+    manifest = {**metadata, "assets": assets}
+    tmp_path = f"{MANIFEST_PATH}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+    keep = {variant["file"] for asset in assets.values() for variants in asset["variants"].values() for variant in variants}
+    for filename in os.listdir(ASSET_DIR):
+        if filename != os.path.basename(MANIFEST_PATH) and filename not in keep:
+            os.remove(os.path.join(ASSET_DIR, filename))
+    return manifest
+
+
+def _is_fresh(manifest):
+    return {key: manifest.get(key) for key in ("pipeline_version", "avif", "sources")} == _source_metadata()
+
+
+def _read_manifest():
+    # The manifest on disk if it matches the current sources, else None
+    try:
+        with open(MANIFEST_PATH) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return manifest if _is_fresh(manifest) else None
+
+
+def get_manifest():
+    # The asset manifest, or None while it is not built yet. Never builds:
+    # that happens with the image (python assetPipeline.py) or in warm-up.
+    global _manifest
+    if _manifest is None:
+        _manifest = _read_manifest()
+    return _manifest
+
+
+def prepare_assets():
+    # Loads the manifest, (re)building the variants once when missing or stale
+    global _manifest
+    with _lock:
+        if get_manifest() is None:
+            logger.info("Building image assets in %s", ASSET_DIR)
+            _manifest = build_assets()
+    return _manifest
+
+
+def _srcset(variants):
+    # Tornado serves ?v=... requests with a far-future Cache-Control, which
+    # is safe because every file name is content-hashed
+    return ", ".join(f"{ASSET_URL}/{v['file']}?v={v['hash']} {v['width']}w" for v in variants)
+
+
+def picture_html(name, alt="", style="", sizes="100vw", eager=False):
+    # <picture> for an asset: modern formats first, then the fallback <img>,
+    # letting the browser pick the width that fits `sizes`. Below-the-fold
+    # images are lazy-loaded. Until the manifest is ready the original image
+    # is linked instead.
+    manifest = get_manifest()
+    if manifest is None:
+        return (
+            f'<img src="{ORIGIN_URL}/{ASSETS[name][0]}" alt="{alt}" style="height: auto; {style}" '
+            f'loading="{"eager" if eager else "lazy"}" decoding="async" />'
+        )
+    asset = manifest["assets"][name]
+    variants = asset["variants"]
+    fallback = variants[asset["fallback"]]
+    sources = "".join(
+        f'<source type="{_MIME_TYPES[fmt]}" srcset="{_srcset(variants[fmt])}" sizes="{sizes}" />'
+        for fmt in variants if fmt != asset["fallback"]
+    )
+    largest = fallback[-1]
+    return (
+        f"<picture>{sources}"
+        f'<img src="{ASSET_URL}/{largest["file"]}?v={largest["hash"]}" srcset="{_srcset(fallback)}" sizes="{sizes}" '
+        f'width="{asset["width"]}" height="{asset["height"]}" alt="{alt}" style="height: auto; {style}" '
+        f'loading="{"eager" if eager else "lazy"}" decoding="async" />'
+        "</picture>"
+    )
+
+
+if __name__ == "__main__":
+    # Build-time asset stage: python assetPipeline.py
+    manifest = build_assets()
+    for name, asset in manifest["assets"].items():
+        sizes = {fmt: sum(os.path.getsize(os.path.join(ASSET_DIR, v["file"])) for v in variants) for fmt, variants in asset["variants"].items()}
+        print(f"{name:<12} {ASSETS[name][0]:<20} " + "  ".join(f"{fmt}: {size / 1024:.0f} KiB" for fmt, size in sizes.items()))
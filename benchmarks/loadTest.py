@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+import numpy as np
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, "dashboard.py")
+
+MENU_ENTRIES = ["Dashboard", "About Nova", "Machine Learning", "Risk Management", "Main Takeaway", "Meet Nexus"]
+
+# Share of each action in a simulated session
+ACTION_WEIGHTS = {
+    "importe_year": 3,
+    "risk_year": 3,
+    "risk_filter": 4,
+    "risk_section": 2,
+    "navigate": 3,
+}
+YEAR_SELECTBOXES = {"importe_year": "Select Year for Importe", "risk_year": "Select Year for Risk"}
+RISK_MULTISELECTS = ["Risk Level", "Most Purchased Category"]
+
+
+class Session:
+    # One simulated browser tab: a websocket client speaking Streamlit's
+    # protocol. It tracks the widgets of the last render, sends widget changes
+    # as rerun requests (fragment reruns for widgets inside fragments, like the
+    # frontend) and times each rerun until the server reports it finished.
+
+    def __init__(self, url, seed, timeout):
+        self.url = url
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.connection = None
+        self.widgets = {}
+        self.states = {}
+        self.page = "Dashboard"
+        self.latencies = []
+        self.errors = 0
+
+    async def connect(self):
+        ws_url = self.url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        request = HTTPRequest(ws_url, headers={"Origin": self.url}, request_timeout=self.timeout)
+        self.connection = await websocket_connect(request, max_message_size=256 * 1024 * 1024)
+        await self._rerun()
+        self.latencies.clear()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def _find(self, kind, label=None):
+        return [w for w in self.widgets.values() if w["kind"] == kind and (label is None or w["element"].label == label)]
+
+    async def _rerun(self, fragment_id=""):
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.fragment_id = fragment_id
+        client_state.widget_states.widgets.extend(state for widget_id, state in self.states.items() if widget_id in self.widgets)
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), self.timeout)
+            if raw is None:
+                raise ConnectionError("server closed the session")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session" and not forward.new_session.fragment_ids_this_run:
+                # A full run re-renders every element; a fragment run only its own
+                self.widgets.clear()
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._track(forward.delta.new_element, forward.delta.fragment_id)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                self.latencies.append(time.perf_counter() - start)
+                return
+
+    def _track(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors += 1
+        if kind in ("selectbox", "multiselect", "checkbox", "component_instance"):
+            widget = getattr(element, kind)
+            self.widgets[widget.id] = {"kind": kind, "element": widget, "fragment_id": fragment_id}
+
+    async def _set(self, widget, **value):
+        state = WidgetState(id=widget["element"].id, **value)
+        self.states[state.id] = state
+        await self._rerun(widget["fragment_id"])
+
+    async def _go(self, page):
+        self.page = page
+        menu = [w for w in self._find("component_instance") if "option_menu" in w["element"].component_name]
+        await self._set(menu[0], json_value=json.dumps(page))
+
+    async def step(self):
+        # One user interaction, i.e. one rerun
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        if action in YEAR_SELECTBOXES:
+            if self.page != "Dashboard":
+                return await self._go("Dashboard")
+            selectbox = self._find("selectbox", YEAR_SELECTBOXES[action])[0]
+            return await self._set(selectbox, string_value=self.rng.choice(list(selectbox["element"].options)))
+        if action in ("risk_filter", "risk_section"):
+            if self.page != "Risk Management":
+                return await self._go("Risk Management")
+            if action == "risk_section":
+                toggle = self.rng.choice(self._find("checkbox", "Toggle"))
+                current = self.states.get(toggle["element"].id)
+                opened = current.bool_value if current is not None else toggle["element"].default
+                return await self._set(toggle, bool_value=not opened)
+            multiselect = self._find("multiselect", self.rng.choice(RISK_MULTISELECTS))[0]
+            options = list(multiselect["element"].options)
+            chosen = [option for option in options if self.rng.random() < 0.7] or options[:1]
+            state = WidgetState(id=multiselect["element"].id)
+            state.string_array_value.data.extend(chosen)
+            self.states[state.id] = state
+            return await self._rerun(multiselect["fragment_id"])
+        return await self._go(self.rng.choice([entry for entry in MENU_ENTRIES if entry != self.page]))
+
+
+def rss_bytes(pid):
+    # Resident set size of the server process (the replica)
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def run_level(url, pid, n_sessions, duration, timeout, seed):
+    # Runs n_sessions concurrent sessions for `duration` seconds; returns the
+    # rerun latency percentiles, throughput and replica memory
+    sessions = [Session(url, seed * 1000 + i, timeout) for i in range(n_sessions)]
+    await asyncio.gather(*(session.connect() for session in sessions))
+    peak_rss = rss_bytes(pid) if pid else 0
+
+    async def drive(session):
+        nonlocal peak_rss
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            await session.step()
+            if pid:
+                peak_rss = max(peak_rss, rss_bytes(pid))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(session) for session in sessions))
+    elapsed = time.perf_counter() - start
+    for session in sessions:
+        session.close()
+
+    latencies = np.array([latency for session in sessions for latency in session.latencies])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (float("nan"),) * 3
+    return {
+        "sessions": n_sessions,
+        "reruns": int(len(latencies)),
+        "errors": sum(session.errors for session in sessions),
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "mean_s": float(latencies.mean()) if len(latencies) else float("nan"),
+        "throughput_rps": len(latencies) / elapsed,
+        "rss_bytes": rss_bytes(pid) if pid else None,
+        "peak_rss_bytes": peak_rss or None,
+    }
+
+
+def start_server(port):
+    # A fresh replica: `streamlit run dashboard.py` on a local port
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", DASHBOARD, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://localhost:{port}"
+    for _ in range(600):
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1):
+                return server, url
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("streamlit exited during start-up")
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("streamlit did not become healthy")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of one dashboard.py replica")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="concurrency levels to run")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds a single rerun may take")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="test a running replica instead of starting one")
+    parser.add_argument("--pid", type=int, help="process id of the --url replica, for its memory")
+    parser.add_argument("--port", type=int, default=8599, help="port for the replica this harness starts")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    url, pid = args.url, args.pid
+    if url is None:
+        server, url = start_server(args.port)
+        pid = server.pid
+    levels = []
+    try:
+        for n_sessions in args.sessions:
+            level = asyncio.run(run_level(url, pid, n_sessions, args.duration, args.timeout, args.seed))
+            levels.append(level)
+            memory = f"RSS {level['rss_bytes'] / 2**20:7.1f} MiB" if level["rss_bytes"] else ""
+            print(
+                f"{n_sessions:>4} sessions  {level['reruns']:>6} reruns  "
+                f"p50 {level['p50_s'] * 1000:8.1f} ms  p95 {level['p95_s'] * 1000:8.1f} ms  p99 {level['p99_s'] * 1000:8.1f} ms  "
+                f"{level['throughput_rps']:7.1f} reruns/s  {memory}  errors {level['errors']}",
+                file=sys.stderr,
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"url": url, "duration_s": args.duration, "levels": levels}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
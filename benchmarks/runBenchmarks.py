@@ -0,0 +1,282 @@
+import os
+import sys
+import gc
+import json
+import time
+import datetime
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import dataLoader
+import dataCube
+import kpiEngine
+import filterIndex
+import affiliationDims
+import categoryDims
+from figureCache import figure_cache
+from graphImporte import get_importe_plotly_figure
+from graphRisk import get_risk_plotly_figure, get_account_age_plotly_figure_by_affiliation, affiliation_year_range, account_age_counts
+from riskProfile import risk_summary, seasonality_summary
+from syntheticData import ensure_dataset
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Memory fields compared against a baseline, next to the median time
+MEMORY_FIELDS = ["peak_bytes", "arrow_allocated_bytes", "arrow_peak_bytes", "peak_rss_bytes"]
+# Memory growth below this is noise, whatever its ratio
+MEMORY_NOISE_BYTES = 2**20
+
+
+def reset_caches(path=None):
+    # Drops every process-wide cache so each run measures the real work.
+    # With a path, the on-disk sidecar, store and saved cube are removed as well (cold load).
+    dataLoader._datasets.clear()
+    dataCube._cubes.clear()
+    kpiEngine._kpis.clear()
+    filterIndex._indexes.clear()
+    affiliationDims._dims.clear()
+    categoryDims.category_hierarchy.cache_clear()
+    categoryDims.payment_labels.cache_clear()
+    figure_cache.clear()
+    if path is not None:
+        for cached in (dataLoader.sidecar_path(path), dataLoader.store_path(path), dataLoader.derived_path(path, dataCube.CUBE_KIND)):
+            if os.path.exists(cached):
+                os.remove(cached)
+    gc.collect()
+
+
+def drop_saved_cube(path):
+    saved = dataLoader.derived_path(path, dataCube.CUBE_KIND)
+    if os.path.exists(saved):
+        os.remove(saved)
+
+
+def risk_page_aggregations(path):
+    # What the Risk Management page computes for its default (unfiltered) view
+    cube = dataCube.get_cube(path)
+    where = {"riskclient": cube.dimension_values("riskclient")}
+    risk_summary(path, where)
+    seasonality_summary(path, where)
+    categoryDims.category_group_counts(cube.rollup(["riskclient", "most_purchased_category"], where=where))
+    payments = cube.rollup(["riskclient", "medio_pago"], where=where)
+    categoryDims.payment_display(payments["medio_pago"])
+
+
+def clear_selections(path):
+    index = filterIndex.get_filter_index(path)
+    with index._lock:
+        index._results.clear()
+        index._result_bytes = 0
+
+
+def risk_page_selection(path):
+    index = filterIndex.get_filter_index(path)
+    index.select({"riskclient": [1], "medio_pago": ["Cash", "Loan"]})
+
+
+# name -> (setup(path), benchmark(path)); setup puts the caches in the state
+# the benchmark starts from and is not timed
+BENCHMARKS = {
+    "load_cold": (lambda path: reset_caches(path), dataLoader.load_dataset),
+    "load_warm": (lambda path: (dataLoader.ensure_store(path), reset_caches()), dataLoader.load_dataset),
+    "cube_build": (lambda path: (reset_caches(), drop_saved_cube(path), dataLoader.load_dataset(path)), dataCube.get_cube),
+    # What another replica (or a restart) pays for a cube already saved to the cache directory
+    "cube_load_saved": (lambda path: (dataCube.get_cube(path), reset_caches()), dataCube.get_cube),
+    "kpis": (lambda path: (reset_caches(), dataCube.get_cube(path)), kpiEngine.compute_kpis),
+    "importe_figure": (
+        lambda path: (figure_cache.clear(), dataCube.get_cube(path)),
+        lambda path: get_importe_plotly_figure(path, year="All", height=500),
+    ),
+    "risk_figure": (
+        lambda path: (figure_cache.clear(), dataCube.get_cube(path)),
+        lambda path: get_risk_plotly_figure(path, year="All", height=500),
+    ),
+    "account_age_figure": (
+        lambda path: (figure_cache.clear(), dataLoader.load_dataset(path)),
+        lambda path: get_account_age_plotly_figure_by_affiliation(path, year_range=affiliation_year_range(path)),
+    ),
+    # Age groups for a new as-of date once the affiliation-day dimension exists
+    "account_age_next_day": (
+        lambda path: affiliationDims.get_affiliation_days(path),
+        lambda path: account_age_counts(path, year_range=affiliation_year_range(path), as_of=datetime.date.today() + datetime.timedelta(days=1)),
+    ),
+    "risk_page_aggregations": (lambda path: dataCube.get_cube(path), risk_page_aggregations),
+    "filter_index_build": (lambda path: (filterIndex._indexes.clear(), dataLoader.load_dataset(path)), filterIndex.get_filter_index),
+    "risk_page_selection": (clear_selections, risk_page_selection),
+}
+
+
+def _status_bytes(field):
+    # A VmRSS/VmHWM-style field of /proc/self/status, in bytes (None off Linux)
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Restarts the RSS high-water mark (Linux >= 4.0); elsewhere the peak
+    # also covers the setup
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def measure_benchmark(name, path, repeat):
+    # Median/min wall time over `repeat` runs, then one extra run for memory:
+    # tracemalloc's peak of Python/NumPy allocations, the Arrow memory pool
+    # (which tracemalloc does not see) and the RSS high-water mark, which also
+    # counts the memory-mapped pages the run touched
+    setup, benchmark = BENCHMARKS[name]
+    timings = []
+    for _ in range(repeat):
+        setup(path)
+        start = time.perf_counter()
+        benchmark(path)
+        timings.append(time.perf_counter() - start)
+    setup(path)
+    gc.collect()
+    _reset_peak_rss()
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    benchmark(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "benchmark": name,
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "repeat": repeat,
+        "peak_bytes": peak,
+        # Arrow memory the run still holds, and the pool's peak over this
+        # process (a fresh one per benchmark, see run_benchmark)
+        "arrow_allocated_bytes": pa.total_allocated_bytes() - arrow_before,
+        "arrow_peak_bytes": pa.default_memory_pool().max_memory(),
+        "peak_rss_bytes": _status_bytes("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def run_benchmark(name, path, repeat):
+    # Each benchmark runs in a fresh process, so its Arrow pool and RSS peaks
+    # are its own and not left over from the benchmarks before it
+    worker = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", name, path, "--repeat", str(repeat)],
+        capture_output=True, text=True,
+    )
+    if worker.returncode != 0:
+        sys.stderr.write(worker.stderr)
+        raise RuntimeError(f"Benchmark {name} failed on {path}")
+    return json.loads(worker.stdout.splitlines()[-1])
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # (result, field, ratio) for each median time or memory peak that grew by
+    # more than `tolerance` (a fraction). Fields the baseline lacks are skipped.
+    previous = {(r["rows"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["benchmark"]))
+        if before is None:
+            continue
+        result["baseline"] = {}
+        for field in ["median_s"] + MEMORY_FIELDS:
+            if not before.get(field) or result.get(field) is None:
+                continue
+            ratio = result[field] / before[field]
+            result["baseline"][field] = before[field]
+            result[f"{field}_ratio"] = ratio
+            noise = field != "median_s" and result[field] - before[field] < MEMORY_NOISE_BYTES
+            if ratio > 1 + tolerance and not noise:
+                regressions.append((result, field, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and measure the dashboard's data paths on synthetic datasets")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", default=None, help="results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown (or memory growth) vs the baseline, as a fraction")
+    parser.add_argument("--worker", nargs=2, metavar=("BENCHMARK", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        # One benchmark in this (fresh) process; the result goes to stdout
+        print(json.dumps(measure_benchmark(*args.worker, args.repeat)))
+        return 0
+
+    # Keep the benchmark sidecars/stores next to the synthetic data, away from Data/.cache
+    os.environ["NEXUS_CACHE_DIR"] = os.path.join(args.data_dir, ".cache")
+    results = []
+    for n_rows in args.rows:
+        path = ensure_dataset(args.data_dir, n_rows, args.seed)
+        for name in args.only or BENCHMARKS:
+            result = {"rows": n_rows, **run_benchmark(name, path, args.repeat)}
+            results.append(result)
+            print(
+                f"{n_rows:>11,} {name:<24} {result['median_s'] * 1000:10.1f} ms  peak {result['peak_bytes'] / 2**20:8.1f} MiB"
+                f"  arrow {result['arrow_peak_bytes'] / 2**20:8.1f} MiB  rss {result['peak_rss_bytes'] / 2**20:8.1f} MiB",
+                file=sys.stderr,
+            )
+
+    report = {
+        "environment": environment(),
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        report["baseline"] = args.baseline
+        report["regressions"] = [(r["rows"], r["benchmark"], field, round(ratio, 3)) for r, field, ratio in regressions]
+        for r, field, ratio in regressions:
+            print(f"REGRESSION {r['rows']:,} {r['benchmark']} {field}: {ratio:.2f}x the baseline", file=sys.stderr)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{report['environment']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(output)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+# Column order and formats of Data/aggregated_df.csv
+COLUMNS = [
+    "loan_request_id", "approved", "total_importe", "mes_compra", "year", "quarter",
+    "quarterpercentage", "month", "num_delinquencies", "ever_delinquent",
+    "most_purchased_category", "medio_pago", "canal", "riskclient", "dias_entre_compras",
+    "delta_importe", "promedio_cliente", "temporada_alta_relativa", "es_temporada_alta_real",
+    "promedio_temporada_alta", "temporada_alta_ajustada", "fecha_afiliacion", "external_account_id",
+]
+
+CATEGORIES = [
+    "automotive_parts", "books_media", "clothing", "electronics", "furniture", "garden_outdoor",
+    "health_beauty", "home_appliances", "jewelry", "kitchen_dining", "musical_instruments",
+    "office_supplies", "sports_equipment", "tools_hardware", "toys_games",
+]
+PAYMENT_METHODS = ["Cash", "Credit Card", "Debit Card", "Loan"]
+
+# Marginals observed in the bundled 2,000-row sample
+YEAR_WEIGHTS = {2024: 0.943, 2025: 0.057}
+APPROVAL_RATE = 0.706
+RISK_RATE = 0.7475
+EVER_DELINQUENT_RATE = 0.7435
+HIGH_SEASON_RATE = 0.6045
+# total_importe is flat up to 120k, then tails off linearly to 200k
+IMPORTE_FLAT_SHARE, IMPORTE_FLAT_MAX, IMPORTE_MAX = 0.84, 120_000, 200_000
+AFFILIATION_START, AFFILIATION_END = np.datetime64("2016-01-01"), np.datetime64("2025-12-31")
+ACCOUNT_ID_BASE = 100100000000
+
+# Rows generated and written per step
+CHUNK_ROWS = 500_000
+
+
+def generate_chunk(rng, first_id, n_rows, n_accounts):
+    # One chunk of rows with the sample's schema and value distributions
+    month = rng.integers(1, 13, n_rows)
+    affiliation_days = (AFFILIATION_END - AFFILIATION_START).astype(int)
+    return pd.DataFrame({
+        "loan_request_id": np.arange(first_id, first_id + n_rows),
+        "approved": (rng.random(n_rows) < APPROVAL_RATE).astype(int),
+        "total_importe": np.where(
+            rng.random(n_rows) < IMPORTE_FLAT_SHARE,
+            rng.uniform(500, IMPORTE_FLAT_MAX, n_rows),
+            rng.triangular(IMPORTE_FLAT_MAX, IMPORTE_FLAT_MAX, IMPORTE_MAX, n_rows),
+        ).round(2),
+        "mes_compra": month,
+        "year": rng.choice(list(YEAR_WEIGHTS), n_rows, p=list(YEAR_WEIGHTS.values())),
+        "quarter": (month - 1) // 3 + 1,
+        "quarterpercentage": rng.uniform(0, 100, n_rows).round(10),
+        "month": month,
+        "num_delinquencies": rng.integers(0, 5, n_rows),
+        "ever_delinquent": rng.random(n_rows) < EVER_DELINQUENT_RATE,
+        "most_purchased_category": rng.choice(CATEGORIES, n_rows),
+        "medio_pago": rng.choice(PAYMENT_METHODS, n_rows),
+        "canal": "sucursal",
+        "riskclient": (rng.random(n_rows) < RISK_RATE).astype(int),
+        "dias_entre_compras": rng.uniform(0.1, 200, n_rows).round(10),
+        "delta_importe": rng.uniform(-500, 500, n_rows).round(10),
+        "promedio_cliente": rng.uniform(200, 2000, n_rows).round(2),
+        "temporada_alta_relativa": rng.integers(5, 16, n_rows) / 10,
+        "es_temporada_alta_real": (rng.random(n_rows) < HIGH_SEASON_RATE).astype(int),
+        "promedio_temporada_alta": rng.uniform(200, 2500, n_rows).round(2),
+        "temporada_alta_ajustada": rng.random(n_rows),
+        "fecha_afiliacion": (AFFILIATION_START + rng.integers(0, affiliation_days + 1, n_rows).astype("timedelta64[D]")).astype(str),
+        # Written as floats, like the sample (the loader restores int64)
+        "external_account_id": (ACCOUNT_ID_BASE + rng.integers(0, n_accounts, n_rows)).astype(float),
+    })[COLUMNS]
+
+
+def generate_csv(path, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    # Writes n_rows synthetic rows to path in bounded chunks. Accounts are
+    # drawn from a pool of max(1M, n_rows) ids, so large datasets repeat accounts.
+    n_accounts = max(1_000_000, n_rows)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.partial"
+    with open(tmp_path, "w", newline="") as fh:
+        for index, start in enumerate(range(0, n_rows, chunk_rows)):
+            rng = np.random.default_rng([seed, index])
+            chunk = generate_chunk(rng, start + 1, min(chunk_rows, n_rows - start), n_accounts)
+            chunk.to_csv(fh, header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(data_dir, n_rows, seed=0):
+    return os.path.join(data_dir, f"synthetic_{n_rows}_s{seed}.csv")
+
+
+def ensure_dataset(data_dir, n_rows, seed=0):
+    # Generated once per (size, seed) and reused by later runs
+    path = dataset_path(data_dir, n_rows, seed)
+    if not os.path.exists(path):
+        generate_csv(path, n_rows, seed)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic datasets with the aggregated_df.csv schema")
+    parser.add_argument("rows", type=int, nargs="+", help="dataset sizes, e.g. 10000 1000000 10000000")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for n_rows in args.rows:
+        print(ensure_dataset(args.data_dir, n_rows, args.seed), file=sys.stderr)
@@ -0,0 +1,67 @@
+import functools
+import numpy as np
+import pandas as pd
+
+OTHER_GROUP = "Otros"
+
+
+@functools.lru_cache(maxsize=32)
+def category_hierarchy(categories):
+    # Display hierarchy for a tuple of raw most_purchased_category values,
+    # computed once per distinct category set (i.e. once per dataset):
+    #   clean name: "item_" prefix removed
+    #   group:      first word of the clean name, capitalized
+    # Groups are integer-coded: group_codes[i] is the group of categories[i].
+    clean = [str(category).replace('item_', '') for category in categories]
+    group_codes, groups = pd.factorize(pd.Index([name.split('_')[0].capitalize() for name in clean]), sort=True)
+    return clean, np.asarray(groups, dtype=object), group_codes
+
+
+@functools.lru_cache(maxsize=32)
+def payment_labels(payments):
+    # Display label per raw medio_pago value, in the same order
+    return np.asarray([str(payment).capitalize() for payment in payments], dtype=object)
+
+
+def _coded(values):
+    # Integer codes + categories for a (possibly non-categorical) dimension column
+    values = pd.Categorical(values)
+    return values.codes, tuple(values.categories)
+
+
+def payment_display(values):
+    codes, payments = _coded(values)
+    return payment_labels(payments)[codes]
+
+
+def category_group_counts(rolled, min_count=10):
+    # Loan counts per (riskclient, category group) from counts per
+    # (riskclient, most_purchased_category), folding every group with fewer
+    # than `min_count` loans at each risk level into "Otros".
+    if rolled.empty:
+        return pd.DataFrame({'riskclient': [], 'category_group': [], 'count': []})
+
+    codes, categories = _coded(rolled['most_purchased_category'])
+    _, groups, group_codes = category_hierarchy(categories)
+    risk_codes, risk_levels = pd.factorize(rolled['riskclient'], sort=True)
+    n_risk = len(risk_levels)
+
+    # (group x risk) count and presence matrices
+    cell = group_codes[codes] * n_risk + risk_codes
+    counts = np.bincount(cell, weights=rolled['n'], minlength=len(groups) * n_risk).reshape(len(groups), n_risk)
+    present = np.bincount(cell, minlength=len(groups) * n_risk).reshape(len(groups), n_risk) > 0
+
+    # Fold small groups into "Otros" in one vectorized pass
+    labels = np.where((counts < min_count).all(axis=1), OTHER_GROUP, groups)
+    label_codes, final_labels = pd.factorize(labels, sort=True)
+    folded = np.zeros((len(final_labels), n_risk))
+    np.add.at(folded, label_codes, counts)
+    folded_present = np.zeros((len(final_labels), n_risk), dtype=bool)
+    np.logical_or.at(folded_present, label_codes, present)
+
+    risk_idx, label_idx = np.nonzero(folded_present.T)
+    return pd.DataFrame({
+        'riskclient': np.asarray(risk_levels)[risk_idx],
+        'category_group': np.asarray(final_labels)[label_idx],
+        'count': folded[label_idx, risk_idx].astype(np.int64),
+    })
@@ -1,24 +1,24 @@
 import streamlit as st
 import pandas as pd
-import numpy as np 
-import os
-import json
-import plotly.express as px
-import plotly.graph_objects as go
 from streamlit_option_menu import option_menu
-from graphImporte import get_importe_plotly_figure
-from graphRisk import get_risk_plotly_figure, get_account_age_plotly_figure_by_affiliation
-import time
-
-# Import your page modules
-from pages import Acerca_de, Key_Findings, User_Persona_Dashboard, Meet_Nexus, ML_Models
-
-# Then, use them as:
-page1 = Acerca_de
-page2 = Key_Findings
-page3 = User_Persona_Dashboard
-page4 = Meet_Nexus
-page5 = ML_Models
+from dataLoader import DEFAULT_CSV_PATH, STREAM_CHUNKSIZE
+from dataCube import get_cube
+from liveIngest import LIVE_SOURCE, LIVE_REFRESH_SECONDS, get_feed
+from kpiEngine import compute_kpis
+from lazyImport import load_module
+from assetPipeline import picture_html
+from warmup import warm_up
+from perfTrace import span, start_rerun, render_panel
+
+# Page modules are imported on demand, the first time their menu entry is
+# selected (python lazyImport.py reports what each import costs)
+PAGE_MODULES = {
+    "About Nova": "pages.Acerca_de",
+    "Main Takeaway": "pages.Key_Findings",
+    "Risk Management": "pages.User_Persona_Dashboard",
+    "Meet Nexus": "pages.Meet_Nexus",
+    "Machine Learning": "pages.ML_Models",
+}
 
 st.set_page_config(
     page_title='NEXUS Dashboard',
@@ -27,6 +27,10 @@ st.set_page_config(
     layout='wide'
 )
 
+# Developer performance panel (?perf=1): times the stages of this rerun and
+# shows them as a waterfall at the bottom of the page. Off, spans are no-ops.
+perf = start_rerun(st.query_params.get("perf") == "1")
+
 # Custom CSS to hide sidebar and other elements
 st.markdown(
     """
@@ -47,30 +51,35 @@ st.markdown(
 )
 
 # --- SPLASH SCREEN ---
-if "splash_shown" not in st.session_state:
-    splash = st.empty()
-    with splash.container():
-        st.markdown(
-            """
-            <style>
-            /* Change progress bar color */
-            .stProgress > div > div > div > div {
-                background-color: #d9ccef !important;
-            }
-            </style>
-            <div style="display:flex;flex-direction:column;align-items:center;justify-content:center;height:60vh;">
-                <img src="https://raw.githubusercontent.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/refs/heads/main/NEXUS.png" width="180"/>
-                <h1 style="color:#824d74;text-align:center;">Welcome to NEXUS Dashboard</h1>
-                <p style="font-size:1.2rem;color:#d88876;text-align:center;">Loading, please wait...</p>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-        progress = st.progress(0)
-        for percent in range(1, 101):
-            time.sleep(2/100)  # 2 seconds total
-            progress.progress(percent)
-    splash.empty()
+# Warm-up runs once per process in the background (dataset, cube, KPIs and
+# the default figures). The splash tracks its real progress and is skipped
+# once the process is warm.
+warm_up.start()
+if "splash_shown" not in st.session_state and not warm_up.is_warm():
+    with span("warm-up wait"):
+        splash = st.empty()
+        with splash.container():
+            st.markdown(
+                f"""
+                <style>
+                /* Change progress bar color */
+                .stProgress > div > div > div > div {{
+                    background-color: #d9ccef !important;
+                }}
+                </style>
+                <div style="display:flex;flex-direction:column;align-items:center;justify-content:center;height:60vh;">
+                    {picture_html("nexus_logo", alt="NEXUS", style="width: 180px;", sizes="180px", eager=True)}
+                    <h1 style="color:#824d74;text-align:center;">Welcome to NEXUS Dashboard</h1>
+                    <p style="font-size:1.2rem;color:#d88876;text-align:center;">Loading, please wait...</p>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+            progress = st.progress(0)
+            while not warm_up.wait(timeout=0.1):
+                progress.progress(int(warm_up.progress * 100), text=warm_up.current)
+            progress.progress(100)
+        splash.empty()
     st.session_state["splash_shown"] = True
 
 # --- END SPLASH SCREEN ---
@@ -83,7 +92,7 @@ st.markdown(
 st.markdown(
     f"""
     <div style='display: flex; justify-content: center;'>
-    <img src="https://raw.githubusercontent.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/refs/heads/main/NEXUS.png" style="max-width: 60px; width: 100%" />
+    {picture_html("nexus_logo", alt="NEXUS", style="max-width: 60px; width: 100%;", sizes="60px", eager=True)}
     </div>
     """,
     unsafe_allow_html=True,
@@ -103,7 +112,6 @@ selected = option_menu(
     }
 )
 
-DEFAULT_CSV_PATH = os.path.join(os.path.dirname(__file__), "Data", "aggregated_df.csv")
 csv_path = DEFAULT_CSV_PATH
 
 if csv_path is None:
@@ -111,108 +119,131 @@ if csv_path is None:
     st.stop()
 
 if selected == "Dashboard":
-    st.markdown("## Insights Hub")
-
-    kpi_json_path = os.path.join(os.path.dirname(__file__), "kpis.json")
-    with open(kpi_json_path, "r") as f:
-        kpis = json.load(f)
-
-    kpi1, kpi2 = st.columns(2)
-    with kpi1:
-        st.metric("Loan Approval Rate", f"{kpis['Loan Approval Rate']:.2%}")
-    with kpi2:
-        st.metric("Delinquency Rate", f"{kpis['Delinquency Rate']:.2%}")
-
-    st.markdown("---")
-
-    chart_col1, chart_col2 = st.columns(2)
-
-    with chart_col1:
-        df = pd.read_csv(csv_path)
-        years_importe = df['year'].unique().tolist() if 'year' in df.columns else [2024]
-        years_importe = ["All"] + [str(y) for y in sorted(years_importe)]
+    # Each block below is a fragment: a widget change reruns and resends only
+    # the block that owns it. In live mode the data-driven blocks also rerun
+    # themselves every LIVE_REFRESH_SECONDS.
+    live_refresh = LIVE_REFRESH_SECONDS if LIVE_SOURCE else None
+    # The chart modules (and plotly with them) load with the first Dashboard render
+    get_importe_plotly_figure = load_module("graphImporte").get_importe_plotly_figure
+    graphRisk = load_module("graphRisk")
+    get_risk_plotly_figure = graphRisk.get_risk_plotly_figure
+    get_account_age_plotly_figure_by_affiliation = graphRisk.get_account_age_plotly_figure_by_affiliation
+    affiliation_year_range = graphRisk.affiliation_year_range
+
+    def chart_source():
+        # The snapshot, or the live cube with every row ingested so far
+        if LIVE_SOURCE:
+            feed = get_feed(LIVE_SOURCE, csv_path)
+            feed.poll()
+            return feed.cube
+        return csv_path
+
+    @st.fragment(run_every=live_refresh)
+    def kpi_metrics():
+        # Computed from the data and memoized per dataset version
+        kpis = compute_kpis(chart_source(), chunksize=STREAM_CHUNKSIZE)
+        kpi1, kpi2 = st.columns(2)
+        with kpi1:
+            st.metric("Loan Approval Rate", f"{kpis['Loan Approval Rate']:.2%}")
+        with kpi2:
+            st.metric("Delinquency Rate", f"{kpis['Delinquency Rate']:.2%}")
+
+    def year_options(source):
+        # With NEXUS_STREAM_CHUNKSIZE set the cube is built from bounded chunks
+        # instead of the whole frame
+        return ["All"] + [str(y) for y in get_cube(source, chunksize=STREAM_CHUNKSIZE).dimension_values('year')]
+
+    @st.fragment(run_every=live_refresh)
+    def importe_chart():
+        source = chart_source()
         selected_year_str_importe = st.selectbox(
-            "Select Year for Importe", years_importe, key="importe_year"
+            "Select Year for Importe", year_options(source), key="importe_year"
         )
         selected_year_importe = "All" if selected_year_str_importe == "All" else int(selected_year_str_importe)
-        importe_fig = get_importe_plotly_figure(csv_path, year=selected_year_importe, height=500)
+        importe_fig = get_importe_plotly_figure(source, year=selected_year_importe, height=500, chunksize=STREAM_CHUNKSIZE)
         importe_fig.update_layout(title_text=f"Total amount per month and monthly average per quarter ({selected_year_importe})")
-        st.plotly_chart(importe_fig, use_container_width=True)
+        with span("send importe chart"):
+            st.plotly_chart(importe_fig, use_container_width=True)
 
-    with chart_col2:
-        df = pd.read_csv(csv_path)
-        years_risk = df['year'].unique().tolist() if 'year' in df.columns else [2024]
-        years_risk = ["All"] + [str(y) for y in sorted(years_risk)]
+    @st.fragment(run_every=live_refresh)
+    def risk_chart():
+        source = chart_source()
         selected_year_str_risk = st.selectbox(
-            "Select Year for Risk", years_risk, key="risk_year"
+            "Select Year for Risk", year_options(source), key="risk_year"
         )
         selected_year_risk = "All" if selected_year_str_risk == "All" else int(selected_year_str_risk)
-        risk_fig = get_risk_plotly_figure(csv_path, year=selected_year_risk, height=500)
+        risk_fig = get_risk_plotly_figure(source, year=selected_year_risk, height=500, chunksize=STREAM_CHUNKSIZE)
         risk_fig.update_layout(title_text=f"Risk Client Counts and Percentage by Month ({selected_year_risk})")
-        st.plotly_chart(risk_fig, use_container_width=True)
+        with span("send risk chart"):
+            st.plotly_chart(risk_fig, use_container_width=True)
+
+    @st.fragment
+    def account_age_chart():
+        # Defaults to every affiliation year, read off the shared affiliation-day
+        # dimension (built once per dataset version, not per rerun)
+        af_year_range = st.session_state.get("af_year_range")
+        if af_year_range is None:
+            af_year_range = affiliation_year_range(csv_path)
+
+        account_age_aff_fig = get_account_age_plotly_figure_by_affiliation(csv_path, year_range=af_year_range)
+        account_age_aff_fig.update_layout(
+            title_text="Unique Accounts by Account Age Group"
+        )
+        with span("send account age chart"):
+            st.plotly_chart(account_age_aff_fig, use_container_width=True)
+
+    @st.fragment(run_every=live_refresh)
+    def kpi_tables():
+        kpis = compute_kpis(chart_source(), chunksize=STREAM_CHUNKSIZE)
+        table1, table2, table3 = st.columns(3)
+
+        with table1:
+            st.markdown("#### Loan Requests per Quarter")
+            st.table(pd.DataFrame(list(kpis["Loan Requests per Quarter"].items()), columns=["Quarter", "Requests"]))
+
+        with table2:
+            st.markdown("#### Repayment Rate per Quarter")
+            repayment_df = pd.DataFrame(
+                [(k, f"{v:.2%}") for k, v in kpis["Loan Repayment Rate per Quarter"].items()],
+                columns=["Quarter", "Repayment Rate"]
+            )
+            st.table(repayment_df)
+
+        with table3:
+            st.markdown("#### Avg Purchase Value by Payment Type")
+            avg_purchase_df = pd.DataFrame(
+                [(k, f"${v:,.2f}") for k, v in kpis["Average Purchase Value by Payment Type"].items()],
+                columns=["Payment Type", "Average Value"]
+            )
+            st.table(avg_purchase_df)
+
+    st.markdown("## Insights Hub")
+    with span("kpi metrics"):
+        kpi_metrics()
 
     st.markdown("---")
 
-    df = pd.read_csv(csv_path)
-    af_years = pd.to_datetime(df['fecha_afiliacion']).dt.year
-    min_af_year, max_af_year = int(af_years.min()), int(af_years.max())
+    chart_col1, chart_col2 = st.columns(2)
+    with chart_col1, span("importe chart"):
+        importe_chart()
+    with chart_col2, span("risk chart"):
+        risk_chart()
 
-    af_year_range = st.session_state.get("af_year_range", (min_af_year, max_af_year))
+    st.markdown("---")
 
-    account_age_aff_fig = get_account_age_plotly_figure_by_affiliation(csv_path, year_range=af_year_range)
-    account_age_aff_fig.update_layout(
-        title_text="Unique Accounts by Account Age Group"
-    )
-    st.plotly_chart(account_age_aff_fig, use_container_width=True)
+    with span("account age chart"):
+        account_age_chart()
 
     st.markdown("---")
 
-    table1, table2, table3 = st.columns(3)
+    with span("kpi tables"):
+        kpi_tables()
 
-    with table1:
-        st.markdown("#### Loan Requests per Quarter")
-        st.table(pd.DataFrame(list(kpis["Loan Requests per Quarter"].items()), columns=["Quarter", "Requests"]))
+else:
+    with span(f"page: {selected}"):
+        load_module(PAGE_MODULES[selected]).main()
 
-    with table2:
-        st.markdown("#### Repayment Rate per Quarter")
-        repayment_df = pd.DataFrame(
-            [(k, f"{v:.2%}") for k, v in kpis["Loan Repayment Rate per Quarter"].items()],
-            columns=["Quarter", "Repayment Rate"]
-        )
-        st.table(repayment_df)
-
-    with table3:
-        st.markdown("#### Avg Purchase Value by Payment Type")
-        avg_purchase_df = pd.DataFrame(
-            [(k, f"${v:,.2f}") for k, v in kpis["Average Purchase Value by Payment Type"].items()],
-            columns=["Payment Type", "Average Value"]
-        )
-        st.table(avg_purchase_df)
-
-elif selected == "About Nova":
-    page1.main()
-
-elif selected == "Main Takeaway":  # Updated to match the new name
-    page2.main()
-
-elif selected == "Risk Management":
-    page3.main()
-
-elif selected == "Meet Nexus":
-    page4.main()
-
-elif selected == "Machine Learning":
-    page5.main()
-
-# --- Preload Meet Nexus images (hidden) ---
-meet_nexus_imgs = [
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/team.png?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Andy.jpg?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Dany.png?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Emi.png?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Jorge.png?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Luis.png?raw=true",
-    "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/tagline.jpeg?raw=true",
-]
-for url in meet_nexus_imgs:
-    st.markdown(f"<img src='{url}' style='display:none;'>", unsafe_allow_html=True)
+# Widget changes inside a dashboard block rerun only that block, so the panel
+# describes the last full rerun
+if perf is not None:
+    render_panel(perf)
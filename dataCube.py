@@ -0,0 +1,145 @@
+import hashlib
+import inspect
+from dataLoader import DerivedCache, read_dataset, iter_chunks, fold_partials, load_derived, save_derived
+from aggKernel import group_reduce
+from perfTrace import span
+from affiliationDims import epoch_days
+
+# Every dashboard chart is a count/sum/mean over these low-cardinality dimensions
+CUBE_DIMENSIONS = [
+    "year", "quarter", "month", "riskclient",
+    "most_purchased_category", "medio_pago", "canal", "es_temporada_alta_real",
+]
+
+# Measures kept per cell as sum, sum of squares and non-null count
+CUBE_MEASURES = ["total_importe", "approved", "ever_delinquent", "num_delinquencies", "repaid", "afiliacion_days"]
+
+# Measures derived from other columns rather than read directly
+DERIVED_MEASURES = {
+    # Days since epoch: tenure means become as_of - mean(afiliacion_days)
+    "afiliacion_days": lambda df: epoch_days(df["fecha_afiliacion"]),
+    # Approved loans whose client never went delinquent
+    "repaid": lambda df: (df["approved"].astype(bool) & ~df["ever_delinquent"].astype(bool)).astype("float64"),
+}
+
+
+class DataCube:
+    # Pre-aggregated cells: one row per observed dimension combination with a
+    # loan count `n` plus <measure>_sum / _sumsq / _n columns
+
+    def __init__(self, cells, version=None):
+        self.cells = cells
+        self.version = version
+
+    def dimension_values(self, dim):
+        return sorted(self.cells[dim].unique().tolist())
+
+    def filter(self, where=None):
+        # Cells whose dimension values are in `where[dim]` for every given dim
+        cells = self.cells
+        for dim, values in (where or {}).items():
+            cells = cells[cells[dim].isin(values)]
+        return cells
+
+    def rollup(self, by, where=None):
+        # Sums the matching cells up to the `by` dimensions
+        return self.filter(where).groupby(by, observed=True)[measure_columns()].sum().reset_index()
+
+    def total(self, where=None):
+        # Grand total of the matching cells, as a one-row frame
+        return self.filter(where)[measure_columns()].sum().to_frame().T
+
+
+def measure_columns():
+    columns = ["n"]
+    for measure in CUBE_MEASURES:
+        columns += [f"{measure}_sum", f"{measure}_sumsq", f"{measure}_n"]
+    return columns
+
+
+def mean(rolled, measure):
+    return rolled[f"{measure}_sum"] / rolled[f"{measure}_n"]
+
+
+def variance(rolled, measure):
+    return rolled[f"{measure}_sumsq"] / rolled[f"{measure}_n"] - mean(rolled, measure) ** 2
+
+
+def std(rolled, measure):
+    # Population standard deviation; rounding can leave the variance a hair below 0
+    return variance(rolled, measure).clip(lower=0) ** 0.5
+
+
+def cube_source_columns():
+    # Raw columns a cube build needs
+    return CUBE_DIMENSIONS + [m for m in CUBE_MEASURES if m not in DERIVED_MEASURES] + ["fecha_afiliacion"]
+
+
+def aggregate_cells(df):
+    # Folds raw loan rows into partial cube cells with the bincount kernel
+    values = {}
+    for measure in CUBE_MEASURES:
+        if measure in DERIVED_MEASURES:
+            x = DERIVED_MEASURES[measure](df)
+        else:
+            x = df[measure].astype("float64")
+        valid = x.notna()
+        x = x.where(valid, 0)
+        values[f"{measure}_sum"] = x
+        values[f"{measure}_sumsq"] = x * x
+        values[f"{measure}_n"] = valid
+    cells = group_reduce({dim: df[dim] for dim in CUBE_DIMENSIONS}, values)
+    for measure in CUBE_MEASURES:
+        cells[f"{measure}_n"] = cells[f"{measure}_n"].astype("int64")
+    return cells
+
+
+def build_cube(chunks, version=None):
+    cells = None
+    for chunk in chunks:
+        cells = fold_partials(cells, aggregate_cells(chunk))
+    return DataCube(cells.reset_index(), version)
+
+
+def _definition_hash():
+    # Identifies how cells are built: saved cubes of another layout or build
+    # code (e.g. from an older deploy) are never reused
+    sources = [inspect.getsource(DERIVED_MEASURES[m]) for m in sorted(DERIVED_MEASURES)]
+    sources += [inspect.getsource(f) for f in (aggregate_cells, build_cube, group_reduce)]
+    return hashlib.sha1(repr((CUBE_DIMENSIONS, CUBE_MEASURES, sources)).encode()).hexdigest()[:12]
+
+
+# Name of the saved cube in the cache directory
+CUBE_KIND = f"cube-{_definition_hash()}"
+
+
+def _source_chunks(uploaded_file, chunksize):
+    if chunksize:
+        return iter_chunks(uploaded_file, cube_source_columns(), chunksize)
+    return [read_dataset(uploaded_file)]
+
+
+def _load_or_build_cube(path, fingerprint, chunksize):
+    # Cells saved by any process sharing the cache directory (other
+    # replicas, earlier runs) are reused instead of rescanning the rows
+    with span("load shared cube"):
+        cells = load_derived(path, CUBE_KIND)
+    if cells is not None:
+        return DataCube(cells, version=fingerprint)
+    with span("build cube"):
+        cube = build_cube(_source_chunks(path, chunksize), version=fingerprint)
+    save_derived(path, CUBE_KIND, cube.cells)
+    return cube
+
+
+_cubes = DerivedCache("cube", _load_or_build_cube)
+
+
+def get_cube(uploaded_file, chunksize=None):
+    # Returns the cube for a dataset path (built once per dataset version),
+    # an ad-hoc cube for an uploaded file, or the cube itself if given one
+    if isinstance(uploaded_file, DataCube):
+        return uploaded_file
+    if hasattr(uploaded_file, "read"):
+        return build_cube(_source_chunks(uploaded_file, chunksize))
+    return _cubes.get(uploaded_file, chunksize)
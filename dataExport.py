@@ -0,0 +1,115 @@
+import os
+import time
+import shutil
+import secrets
+import logging
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dataLoader import DEFAULT_CSV_PATH, open_store, load_dataset
+from filterIndex import get_filter_index
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Finished exports are served by Streamlit's static file serving, each under
+# an unguessable token directory, and removed once they are older than the TTL
+EXPORT_DIR = os.path.join(ROOT, "static", "exports")
+EXPORT_URL = "app/static/exports"
+EXPORT_TTL_SECONDS = int(os.environ.get("NEXUS_EXPORT_TTL_SECONDS", "3600"))
+
+# Rows read and written per step; memory use is bounded by this, not by the selection
+EXPORT_CHUNK_ROWS = int(os.environ.get("NEXUS_EXPORT_CHUNK_ROWS", "65536"))
+
+EXPORT_FORMATS = {"CSV": "csv", "Parquet": "parquet"}
+
+
+def remove_expired_exports(ttl=EXPORT_TTL_SECONDS):
+    # Sessions (and replicas sharing the directory) clean up concurrently, so
+    # an export may vanish between listing it and removing it
+    try:
+        tokens = os.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - ttl
+    for token in tokens:
+        export = os.path.join(EXPORT_DIR, token)
+        try:
+            expired = os.path.getmtime(export) < cutoff
+        except FileNotFoundError:
+            continue
+        if expired:
+            shutil.rmtree(export, ignore_errors=True)
+
+
+def new_export(fmt, name="nexus_selection"):
+    # Reserves a file for an export; returns (file path, URL it is served at)
+    remove_expired_exports()
+    token = secrets.token_urlsafe(16)
+    os.makedirs(os.path.join(EXPORT_DIR, token))
+    filename = f"{name}.{fmt}"
+    return os.path.join(EXPORT_DIR, token, filename), f"{EXPORT_URL}/{token}/{filename}"
+
+
+def _row_reader(path, columns):
+    # rows -> frame of those rows, taken from the mapped store when available
+    try:
+        table = open_store(path)
+        if columns is not None:
+            table = table.select(columns)
+        return lambda rows: table.take(pa.array(rows)).to_pandas()
+    except OSError:
+        logger.warning("No dataset store for %s, exporting from the loaded frame", path, exc_info=True)
+        df = load_dataset(path)
+        if columns is not None:
+            df = df[columns]
+        return lambda rows: df.take(rows)
+
+
+def iter_selection_rows(selection, n_rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Row positions of a packed selection bitmap, one bounded slice at a time,
+    # without materializing every selected row id
+    chunk_bytes = max(chunk_rows // 8, 1)
+    for start in range(0, len(selection), chunk_bytes):
+        bits = np.unpackbits(selection[start:start + chunk_bytes], count=min(chunk_bytes * 8, n_rows - start * 8))
+        rows = np.flatnonzero(bits)
+        if len(rows):
+            yield rows + start * 8
+
+
+def write_selection(file_path, path=DEFAULT_CSV_PATH, where=None, fmt="csv", columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Streams the selected rows to file_path in chunks. Yields
+    # (rows written, rows selected) after each chunk; the file appears under
+    # its final name only once complete.
+    filter_index = get_filter_index(path)
+    selection = filter_index.select(where)
+    total = filter_index.count(selection)
+    read_rows = _row_reader(path, columns)
+    chunks = iter_selection_rows(selection, filter_index.n_rows, chunk_rows)
+    if not total:
+        # Still write the header / schema
+        chunks = [np.zeros(0, dtype=np.int64)]
+
+    tmp_path = f"{file_path}.partial"
+    written = 0
+    writer = None
+    try:
+        with open(tmp_path, "wb") as fh:
+            for rows in chunks:
+                chunk = read_rows(rows)
+                if fmt == "csv":
+                    chunk.to_csv(fh, header=written == 0, index=False)
+                else:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(fh, table.schema, compression="zstd")
+                    writer.write_table(table.cast(writer.schema))
+                written += len(rows)
+                yield written, total
+            if fmt == "parquet":
+                writer.close()
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,321 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from perfTrace import span
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data", "aggregated_df.csv")
+
+# Bump whenever the typed schema below changes: older sidecars are then ignored
+SCHEMA_VERSION = 3
+
+# Typed schema applied once, when the CSV is converted to its columnar sidecar
+CATEGORY_COLUMNS = ["most_purchased_category", "medio_pago", "canal"]
+DATE_COLUMNS = ["fecha_afiliacion"]
+ID_COLUMNS = ["loan_request_id", "external_account_id"]
+# Calendar fields, counts and 0/1 flags, narrowed when every value fits. The
+# flags stay integers (not bool) so they still read and export as 0/1.
+NARROW_COLUMNS = {
+    "year": "int16",
+    "quarter": "int8",
+    "month": "int8",
+    "mes_compra": "int8",
+    "num_delinquencies": "int8",
+    "approved": "int8",
+    "riskclient": "int8",
+    "es_temporada_alta_real": "int8",
+}
+
+# Rows per chunk for the bounded-memory aggregation path (0/unset: load whole frame)
+STREAM_CHUNKSIZE = int(os.environ.get("NEXUS_STREAM_CHUNKSIZE", "0")) or None
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_fingerprint(path=DEFAULT_CSV_PATH):
+    # Cheap change detection: path + modification time + size
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class DerivedCache:
+    # Process-wide cache of one value per dataset path (its frame, cube,
+    # indexes...), tagged with the fingerprint it was built from and rebuilt
+    # once the file changes. Every page and chart of every session shares it.
+
+    def __init__(self, name, build):
+        self.name = name
+        self._build = build
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, *args):
+        # build(path, fingerprint, *args) runs at most once per dataset version
+        path = os.path.abspath(path)
+        fingerprint = dataset_fingerprint(path)
+        cached = self._entries.get(path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            with span(self.name):
+                value = self._build(path, fingerprint, *args)
+            self._entries[path] = (fingerprint, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def cache_dir(path=DEFAULT_CSV_PATH):
+    # Sidecars live next to the data unless NEXUS_CACHE_DIR points elsewhere
+    return os.environ.get("NEXUS_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+
+
+def sidecar_path(path=DEFAULT_CSV_PATH):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir(path), f"{name}.v{SCHEMA_VERSION}.parquet")
+
+
+def store_path(path=DEFAULT_CSV_PATH):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir(path), f"{name}.v{SCHEMA_VERSION}.arrow")
+
+
+def derived_path(path=DEFAULT_CSV_PATH, kind="cube"):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir(path), f"{name}.v{SCHEMA_VERSION}.{kind}.parquet")
+
+
+def _narrow_float(values):
+    # float32 copy of a float64 column, or None unless it round-trips exactly
+    narrowed = values.astype("float32")
+    restored = narrowed.astype("float64")
+    if ((restored == values) | values.isna()).all():
+        return narrowed
+    return None
+
+
+def apply_schema(df):
+    # Categoricals for the low-cardinality strings, int64 ids, parsed dates,
+    # narrow integers and float32 wherever that loses nothing
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in ID_COLUMNS:
+        if col in df.columns and df[col].dtype.kind == "f":
+            # Ids arrive as floats ("100100837770.0"); keep nulls if there are any
+            df[col] = df[col].round().astype("Int64" if df[col].isna().any() else "int64")
+    for col, dtype in NARROW_COLUMNS.items():
+        if col in df.columns and df[col].dtype.kind in "iu":
+            info = np.iinfo(dtype)
+            if not len(df) or (df[col].min() >= info.min and df[col].max() <= info.max):
+                df[col] = df[col].astype(dtype)
+    for col in df.columns:
+        if col not in ID_COLUMNS and df[col].dtype == "float64":
+            narrowed = _narrow_float(df[col])
+            if narrowed is not None:
+                df[col] = narrowed
+    return df
+
+
+def footprint(df):
+    # Per-column dtype and in-memory bytes (strings counted in full)
+    usage = df.memory_usage(index=False, deep=True)
+    return pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": usage})
+
+
+def footprint_report(path=DEFAULT_CSV_PATH):
+    # Bytes per column as pandas would load the CSV untyped vs the compact
+    # schema served by load_dataset, with the saving of each column
+    report = footprint(pd.read_csv(path)).join(footprint(load_dataset(path)), lsuffix="_raw", rsuffix="_compact")
+    report["ratio"] = report["bytes_raw"] / report["bytes_compact"]
+    report.loc["total"] = ["", report["bytes_raw"].sum(), "", report["bytes_compact"].sum(), report["bytes_raw"].sum() / report["bytes_compact"].sum()]
+    return report
+
+
+def read_csv_typed(source, **kwargs):
+    dtypes = {col: "category" for col in CATEGORY_COLUMNS}
+    return apply_schema(pd.read_csv(source, dtype=dtypes, **kwargs))
+
+
+def _source_metadata(path):
+    _, mtime_ns, size = dataset_fingerprint(path)
+    return json.dumps({"schema_version": SCHEMA_VERSION, "mtime_ns": mtime_ns, "size": size})
+
+
+def _is_fresh(path, schema):
+    metadata = schema.metadata or {}
+    return metadata.get(b"nexus.source", b"").decode() == _source_metadata(path)
+
+
+def _sidecar_is_fresh(path, sidecar):
+    try:
+        return _is_fresh(path, pq.read_schema(sidecar))
+    except (OSError, pa.ArrowException):
+        return False
+
+
+def _store_is_fresh(path, store):
+    try:
+        with pa.memory_map(store, "r") as source:
+            return _is_fresh(path, pa.ipc.open_file(source).schema)
+    except (OSError, pa.ArrowException):
+        return False
+
+
+def _write_parquet(path, df, target):
+    # Typed, compressed Parquet copy of df tagged with the source version of `path`
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"nexus.source": _source_metadata(path).encode(),
+    })
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Write then rename, so concurrent readers never see a half-written file
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, target)
+    return target
+
+
+def build_sidecar(path=DEFAULT_CSV_PATH):
+    # Conversion stage: parse the CSV once and write a typed, compressed Parquet copy
+    return _write_parquet(path, read_csv_typed(path), sidecar_path(path))
+
+
+def ensure_sidecar(path=DEFAULT_CSV_PATH):
+    # Returns the sidecar for `path`, converting the CSV if it is missing or stale
+    sidecar = sidecar_path(path)
+    if not _sidecar_is_fresh(path, sidecar):
+        build_sidecar(path)
+    return sidecar
+
+
+def build_store(path=DEFAULT_CSV_PATH):
+    # Uncompressed Arrow IPC copy of the sidecar: the format every process on
+    # the host can memory-map read-only instead of holding a private copy
+    # One record batch (one contiguous buffer per column): with a batch per
+    # row group, pandas would have to concatenate every column into a copy
+    table = pq.read_table(ensure_sidecar(path), use_threads=True).combine_chunks()
+    store = store_path(path)
+    tmp_path = f"{store}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, store)
+    return store
+
+
+def ensure_store(path=DEFAULT_CSV_PATH):
+    store = store_path(path)
+    if not _store_is_fresh(path, store):
+        build_store(path)
+    return store
+
+
+def load_derived(path=DEFAULT_CSV_PATH, kind="cube"):
+    # A table derived from the dataset (e.g. its cube) that this or another
+    # process sharing the cache directory saved; None if missing or stale
+    derived = derived_path(path, kind)
+    if not _sidecar_is_fresh(path, derived):
+        return None
+    return pq.read_table(derived).to_pandas()
+
+
+def save_derived(path, kind, df):
+    # Best effort: a read-only cache directory only costs the other replicas a rebuild
+    try:
+        return _write_parquet(path, df, derived_path(path, kind))
+    except OSError:
+        logger.warning("Cannot write the %s of %s to the cache directory", kind, path, exc_info=True)
+        return None
+
+
+def open_store(path=DEFAULT_CSV_PATH):
+    # Maps the store without reading it: pages are faulted in on first touch
+    # and shared through the OS page cache with every other replica
+    return pa.ipc.open_file(pa.memory_map(ensure_store(path), "r")).read_all()
+
+
+def read_columns(path=DEFAULT_CSV_PATH, columns=None):
+    # Column-projected read from the mapped store. Numeric, date and category
+    # code columns come back as read-only, zero-copy views of the mapping.
+    try:
+        table = open_store(path)
+    except OSError:
+        logger.warning("Cannot write dataset store for %s, parsing the CSV instead", path, exc_info=True)
+        df = read_csv_typed(path)
+        return df if columns is None else df[columns]
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas(split_blocks=True)
+
+
+_datasets = DerivedCache("load dataset", lambda path, fingerprint: read_columns(path))
+
+
+def load_dataset(path=DEFAULT_CSV_PATH):
+    # Returns the shared frame for `path`, reloading only when the file changed.
+    # The frame is shared between callers and mostly backed by a read-only
+    # memory map: never modify it in place.
+    return _datasets.get(path)
+
+
+def iter_chunks(uploaded_file, columns, chunksize):
+    # Bounded-memory scan yielding typed frames of at most `chunksize` rows.
+    # Uses record batches of a fresh mapped store, otherwise streams the CSV
+    # itself so the whole file is never parsed at once.
+    dtypes = {col: "category" for col in CATEGORY_COLUMNS if col in columns}
+    if hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        for chunk in pd.read_csv(uploaded_file, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            yield apply_schema(chunk)
+        uploaded_file.seek(0)
+        return
+
+    store = store_path(uploaded_file)
+    if _store_is_fresh(uploaded_file, store):
+        table = pa.ipc.open_file(pa.memory_map(store, "r")).read_all().select(columns)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas(split_blocks=True)
+    else:
+        for chunk in pd.read_csv(uploaded_file, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            yield apply_schema(chunk)
+
+
+def fold_partials(running, partial):
+    # Merges one chunk's grouped partial sums/counts into the running aggregate
+    if running is None:
+        return partial
+    levels = list(range(partial.index.nlevels))
+    return pd.concat([running, partial]).groupby(level=levels, observed=True, dropna=False).sum()
+
+
+def read_dataset(uploaded_file):
+    # Accept both file path and uploaded file-like object
+    if hasattr(uploaded_file, "read"):
+        uploaded_file.seek(0)
+        df = read_csv_typed(uploaded_file)
+        uploaded_file.seek(0)
+        return df
+    return load_dataset(uploaded_file)
+
+
+if __name__ == "__main__":
+    # Build (or refresh) the sidecar and mapped store ahead of time, e.g. during the image build
+    print(ensure_sidecar(DEFAULT_CSV_PATH))
+    print(ensure_store(DEFAULT_CSV_PATH))
+    print(footprint_report(DEFAULT_CSV_PATH).to_string())
@@ -0,0 +1,224 @@
+import os
+import json
+import hashlib
+import logging
+import datetime
+import functools
+import glob
+import inspect
+import threading
+from collections import OrderedDict
+import plotly.graph_objects as go
+from dataLoader import dataset_fingerprint
+from dataCube import DataCube
+from perfTrace import span
+
+# Budget for the process-wide figure cache: whichever limit is hit first evicts
+# the least recently used figures
+FIGURE_CACHE_ENTRIES = int(os.environ.get("NEXUS_FIGURE_CACHE_ENTRIES", "256"))
+FIGURE_CACHE_BYTES = int(os.environ.get("NEXUS_FIGURE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Optional second tier shared by every replica mounting the same directory:
+# a result one process computes is read by the others instead of recomputed
+SHARED_CACHE_DIR = os.environ.get("NEXUS_SHARED_CACHE_DIR")
+SHARED_CACHE_BYTES = int(os.environ.get("NEXUS_SHARED_CACHE_BYTES", str(256 * 1024 * 1024)))
+# The shared directory is trimmed back to its budget every this many writes
+_PRUNE_EVERY = 64
+
+
+def _source_hash():
+    # Hash of the app's Python sources, so a deploy with different code never
+    # reads entries an older build left in the shared directory
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for source in sorted(glob.glob(os.path.join(root, "*.py")) + glob.glob(os.path.join(root, "pages", "*.py"))):
+        digest.update(os.path.relpath(source, root).encode())
+        with open(source, "rb") as fh:
+            digest.update(fh.read())
+    return digest.hexdigest()[:12]
+
+
+BUILD_ID = os.environ.get("NEXUS_BUILD_ID") or _source_hash()
+
+logger = logging.getLogger(__name__)
+
+# Arguments that change how a figure is computed, not what it shows
+_IGNORED_ARGUMENTS = ("uploaded_file", "chunksize")
+
+
+class FigureCache:
+    # Bounded LRU of serialized figures (bytes) with hit/miss counters. With a
+    # shared_dir, misses fall back to files other processes wrote there.
+
+    def __init__(self, max_entries=FIGURE_CACHE_ENTRIES, max_bytes=FIGURE_CACHE_BYTES, shared_dir=None, shared_bytes=SHARED_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared_dir = shared_dir
+        self.shared_bytes = shared_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._shared_writes = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            serialized = self._entries.get(key)
+            if serialized is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return serialized
+        serialized = self._read_shared(key)
+        with self._lock:
+            if serialized is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._remember(key, serialized)
+        return serialized
+
+    def put(self, key, serialized):
+        self._remember(key, serialized)
+        self._write_shared(key, serialized)
+
+    def _shared_file(self, key):
+        # Keys are tuples of plain values, so their repr is the same in every
+        # process running the same build
+        return os.path.join(self.shared_dir, hashlib.sha1(repr((BUILD_ID, key)).encode()).hexdigest())
+
+    def _read_shared(self, key):
+        if not self.shared_dir:
+            return None
+        shared_file = self._shared_file(key)
+        try:
+            with open(shared_file, "rb") as fh:
+                serialized = fh.read()
+            # Recently read files survive pruning longest
+            os.utime(shared_file)
+        except OSError:
+            return None
+        return serialized
+
+    def _write_shared(self, key, serialized):
+        if not self.shared_dir or len(serialized) > self.shared_bytes:
+            return
+        shared_file = self._shared_file(key)
+        tmp_path = f"{shared_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.shared_dir, exist_ok=True)
+            with open(tmp_path, "wb") as fh:
+                fh.write(serialized)
+            os.replace(tmp_path, shared_file)
+        except OSError:
+            logger.warning("Cannot write to the shared cache %s", self.shared_dir, exc_info=True)
+            return
+        with self._lock:
+            self._shared_writes += 1
+            prune = self._shared_writes % _PRUNE_EVERY == 0
+        if prune:
+            self.prune_shared()
+
+    def prune_shared(self):
+        # Deletes the least recently used files until the directory fits its budget
+        try:
+            entries = [entry for entry in os.scandir(self.shared_dir) if entry.is_file() and not entry.name.endswith(".tmp")]
+        except OSError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            stats.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.shared_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _remember(self, key, serialized):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = serialized
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+figure_cache = FigureCache(shared_dir=SHARED_CACHE_DIR and os.path.join(SHARED_CACHE_DIR, "figures"))
+
+
+def source_version(uploaded_file):
+    # Data version a figure depends on; None for uploads, which are not cached
+    if isinstance(uploaded_file, DataCube):
+        return uploaded_file.version
+    if hasattr(uploaded_file, "read"):
+        return None
+    return dataset_fingerprint(uploaded_file)
+
+
+def cached_figure(daily=False):
+    # Memoizes a figure builder on (data version, builder, its arguments).
+    # `daily` builders take an `as_of` date: left unset it becomes today's,
+    # so the key and the figure are always for the same day.
+    def decorator(builder):
+        signature = inspect.signature(builder)
+
+        @functools.wraps(builder)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if daily and bound.arguments["as_of"] is None:
+                bound.arguments["as_of"] = datetime.date.today()
+            version = source_version(bound.arguments["uploaded_file"])
+            if version is None:
+                with span(builder.__name__, cached=False):
+                    return builder(*bound.args, **bound.kwargs)
+
+            key = (version, builder.__name__) + tuple(
+                (name, tuple(value) if isinstance(value, list) else value)
+                for name, value in bound.arguments.items() if name not in _IGNORED_ARGUMENTS
+            )
+            with span(builder.__name__):
+                serialized = figure_cache.get(key)
+                if serialized is None:
+                    with span("build figure"):
+                        serialized = builder(*bound.args, **bound.kwargs).to_json().encode()
+                    figure_cache.put(key, serialized)
+                # A fresh figure per call, since callers update its layout. It was
+                # validated when first built, so skip plotly's (costly) re-validation.
+                with span("restore cached figure"):
+                    return go.Figure(json.loads(serialized), _validate=False)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from dataLoader import DEFAULT_CSV_PATH, DerivedCache, load_dataset
+
+# Dimensions the Risk Management page (and its exports) can filter on
+FILTER_DIMENSIONS = ["riskclient", "most_purchased_category", "medio_pago", "canal", "es_temporada_alta_real"]
+
+# Budget for selection results shared across sessions (packed bitmaps)
+SELECTION_CACHE_BYTES = int(os.environ.get("NEXUS_SELECTION_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Set bits per byte value, for popcounts of packed bitmaps
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+class BitmapIndex:
+    # Per-value row sets for each filter dimension. Like roaring bitmaps, each
+    # value is stored either as a packed bitmap (frequent values) or as a
+    # sorted array of row ids (rare values, where that is smaller).
+    # Selections are answered with bitwise OR within a dimension and AND across.
+
+    def __init__(self, df, version=None):
+        self.version = version
+        self.n_rows = len(df)
+        self.n_bytes = (self.n_rows + 7) // 8
+        self.values = {}
+        self.rowsets = {}
+        self.complete = {}
+        for dim in FILTER_DIMENSIONS:
+            if dim in df.columns:
+                self._index_dimension(dim, df[dim])
+        self._results = OrderedDict()
+        self._result_bytes = 0
+        self._lock = threading.Lock()
+
+    def _index_dimension(self, dim, column):
+        codes, uniques = pd.factorize(column, sort=True)
+        # Small code ranges sort in linear time (radix sort)
+        codes = codes.astype(np.int16 if len(uniques) < 2 ** 15 else np.int64)
+        order = np.argsort(codes, kind="stable").astype(np.uint32)
+        bounds = np.searchsorted(codes[order], np.arange(-1, len(uniques) + 1))
+        rowsets = []
+        for k in range(len(uniques)):
+            ids = order[bounds[k + 1]:bounds[k + 2]]
+            if ids.nbytes >= self.n_bytes:
+                mask = np.zeros(self.n_rows, dtype=bool)
+                mask[ids] = True
+                rowsets.append(np.packbits(mask))
+            else:
+                rowsets.append(ids.copy())
+        self.values[dim] = {value: k for k, value in enumerate(uniques.tolist())}
+        self.rowsets[dim] = rowsets
+        # Rows with a missing value match no selection, so the dimension can
+        # only be skipped when every value is selected and none is missing
+        self.complete[dim] = bounds[1] == 0
+
+    def _union(self, rowsets):
+        packed = np.zeros(self.n_bytes, dtype=np.uint8)
+        mask = None
+        for rowset in rowsets:
+            if rowset.dtype == np.uint8:
+                packed |= rowset
+            else:
+                if mask is None:
+                    mask = np.zeros(self.n_rows, dtype=bool)
+                mask[rowset] = True
+        if mask is not None:
+            packed |= np.packbits(mask)
+        return packed
+
+    def _dimension_bitmap(self, dim, selected):
+        codes = {self.values[dim][value] for value in selected if value in self.values[dim]}
+        n_values = len(self.rowsets[dim])
+        if len(codes) == n_values and self.complete[dim]:
+            return None
+        if len(codes) > n_values // 2 and self.complete[dim]:
+            # Mostly selected: cheaper to OR the few excluded values and invert
+            excluded = [self.rowsets[dim][k] for k in range(n_values) if k not in codes]
+            return ~self._union(excluded)
+        return self._union([self.rowsets[dim][k] for k in codes])
+
+    def select(self, where=None):
+        # Packed bitmap of the rows whose value is in where[dim] for every given dim.
+        # Results are cached, so repeated selections from any session are a lookup.
+        key = tuple(sorted((dim, frozenset(values)) for dim, values in (where or {}).items()))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        bitmap = None
+        for dim, values in (where or {}).items():
+            dim_bitmap = self._dimension_bitmap(dim, values)
+            if dim_bitmap is not None:
+                bitmap = dim_bitmap if bitmap is None else bitmap & dim_bitmap
+        if bitmap is None:
+            bitmap = np.full(self.n_bytes, 0xFF, dtype=np.uint8)
+        bitmap = self._clear_padding(bitmap)
+        bitmap.setflags(write=False)
+
+        with self._lock:
+            self._results[key] = bitmap
+            self._result_bytes += bitmap.nbytes
+            while self._result_bytes > SELECTION_CACHE_BYTES and len(self._results) > 1:
+                _, evicted = self._results.popitem(last=False)
+                self._result_bytes -= evicted.nbytes
+        return bitmap
+
+    def _clear_padding(self, bitmap):
+        # Bits past the last row (inversion sets them) must stay clear
+        padding = self.n_bytes * 8 - self.n_rows
+        if padding:
+            bitmap[-1] &= (0xFF << padding) & 0xFF
+        return bitmap
+
+    def count(self, bitmap):
+        return int(_POPCOUNT[bitmap].sum())
+
+    def rows(self, bitmap):
+        # Row positions of the set bits, ascending
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+
+_indexes = DerivedCache("filter index", lambda path, fingerprint: BitmapIndex(load_dataset(path), version=fingerprint))
+
+
+def get_filter_index(path=DEFAULT_CSV_PATH):
+    # Returns the index for a dataset path, built once per dataset version
+    return _indexes.get(path)
@@ -1,6 +1,7 @@
-import os
-import pandas as pd
 import plotly.graph_objects as go
+from dataCube import get_cube
+from figureCache import cached_figure
+from perfTrace import span
 
 color_palette = {
     "nx1" : "#401f71",
@@ -15,21 +16,21 @@ color_palette = {
     "nx10": "#d9ccef"
 }
 
-def get_importe_plotly_figure(uploaded_file, year="All", height=500, width=900):
-    # Accept both file path and uploaded file-like object
-    if hasattr(uploaded_file, "read"):
-        uploaded_file.seek(0)
-        aggregated_df = pd.read_csv(uploaded_file)
-        uploaded_file.seek(0)
-    else:
-        aggregated_df = pd.read_csv(uploaded_file)
+def importe_monthly_totals(uploaded_file, year="All", chunksize=None):
+    # Per-(quarter, month) sum of total_importe, rolled up from the dataset cube
+    # (built in bounded chunks when a chunksize is given)
+    where = {} if year == "All" else {'year': [int(year)]}
+    monthly = get_cube(uploaded_file, chunksize=chunksize).rollup(['quarter', 'month'], where=where)
+    return monthly[['quarter', 'month', 'total_importe_sum']].rename(columns={'total_importe_sum': 'total_importe'})
 
-    # Filter by year if not "All"
-    if year != "All":
-        aggregated_df = aggregated_df[aggregated_df['year'] == int(year)].copy()
+@cached_figure()
+def get_importe_plotly_figure(uploaded_file, year="All", height=500, width=900, chunksize=None):
+    # Group by (quarter, month) and sum importe
+    with span("importe monthly totals"):
+        monthly_group = importe_monthly_totals(uploaded_file, year=year, chunksize=chunksize)
 
     # If no data for selected year, return empty plot
-    if aggregated_df.empty:
+    if monthly_group.empty:
         fig = go.Figure()
         fig.update_layout(
             title=f"No data for year {year}",
@@ -38,15 +39,8 @@ def get_importe_plotly_figure(uploaded_file, year="All", height=500, width=900):
         )
         return fig
 
-    # Prepare labels and groupings
-    aggregated_df['quarter_label'] = 'Q' + aggregated_df['quarter'].astype(str)
-    aggregated_df['month_str'] = aggregated_df['month'].astype(str)
-    aggregated_df['x'] = aggregated_df['quarter_label'] + '-' + aggregated_df['month_str']
-
-    # Group by (quarter, month) and sum importe
-    monthly_group = aggregated_df.groupby(['quarter_label', 'month']).agg({
-        'total_importe': 'sum'
-    }).reset_index()
+    # Prepare labels for the (at most 12) monthly totals
+    monthly_group['quarter_label'] = 'Q' + monthly_group['quarter'].astype(str)
     monthly_group['x'] = monthly_group['quarter_label'] + '-' + monthly_group['month'].astype(str)
     monthly_group = monthly_group.sort_values(['quarter_label', 'month'])
 
@@ -65,15 +59,11 @@ def get_importe_plotly_figure(uploaded_file, year="All", height=500, width=900):
     ))
 
     # Line for quarterly average
-    # Place the line in the middle of each quarter group
-    quarter_positions = []
-    for q in quarterly_avg['quarter_label']:
-        quarter_months = monthly_group[monthly_group['quarter_label'] == q]['x']
-        if not quarter_months.empty:
-            idx = len(quarter_months) // 2
-            quarter_positions.append(quarter_months.iloc[idx])
-        else:
-            quarter_positions.append(q + '-2')  # fallback
+    # Place the line in the middle of each quarter group: monthly_group is
+    # sorted by quarter, so each group's middle row is start + size // 2
+    quarter_sizes = monthly_group.groupby('quarter_label').size().to_numpy()
+    quarter_middles = quarter_sizes.cumsum() - quarter_sizes + quarter_sizes // 2
+    quarter_positions = monthly_group['x'].iloc[quarter_middles].tolist()
 
     fig.add_trace(go.Scatter(
         x=quarter_positions,
@@ -1,7 +1,9 @@
-import pandas as pd
 import calendar
-import numpy as np
 import plotly.graph_objects as go
+from dataCube import get_cube
+from figureCache import cached_figure
+from affiliationDims import get_affiliation_days
+from perfTrace import span
 
 color_palette = {
     "nx1" : "#401f71",
@@ -16,20 +18,16 @@ color_palette = {
     "nx10": "#d9ccef"
 }
 
-def get_risk_plotly_figure(uploaded_file, year="All", height=500, width=900):
-    # Accept both file path and uploaded file-like object
-    if hasattr(uploaded_file, "read"):
-        uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file)
-        uploaded_file.seek(0)
-    else:
-        df = pd.read_csv(uploaded_file)
+def risk_monthly_counts(uploaded_file, year="All", chunksize=None):
+    # Loan counts per (month, riskclient), rolled up from the dataset cube
+    # (built in bounded chunks when a chunksize is given)
+    where = {} if year in (None, "All") else {'year': [int(year)]}
+    monthly = get_cube(uploaded_file, chunksize=chunksize).rollup(['month', 'riskclient'], where=where)
+    return monthly.set_index(['month', 'riskclient'])['n']
 
-    # Only filter if year is not None and not "All"
-    if 'year' in df.columns and year not in (None, "All"):
-        df = df[df['year'] == int(year)]
-
-    grouped = df.groupby(['month', 'riskclient']).size().unstack(fill_value=0).reset_index()
+def risk_monthly_summary(uploaded_file, year="All", chunksize=None):
+    # Per month: loans at each risk level, their total and the share of risk 1 (%)
+    grouped = risk_monthly_counts(uploaded_file, year=year, chunksize=chunksize).unstack(fill_value=0).reset_index()
     grouped.columns.name = None
 
     if 0 not in grouped.columns:
@@ -40,8 +38,13 @@ def get_risk_plotly_figure(uploaded_file, year="All", height=500, width=900):
     grouped = grouped.rename(columns={0: 'risk_0', 1: 'risk_1'})
     grouped['total'] = grouped['risk_0'] + grouped['risk_1']
     grouped['risk_1_pct'] = (grouped['risk_1'] / grouped['total']) * 100
-    grouped['months'] = grouped['month'].apply(lambda x: calendar.month_abbr[x])
-    grouped = grouped.sort_values('month')
+    return grouped.sort_values('month')
+
+@cached_figure()
+def get_risk_plotly_figure(uploaded_file, year="All", height=500, width=900, chunksize=None):
+    with span("risk monthly summary"):
+        grouped = risk_monthly_summary(uploaded_file, year=year, chunksize=chunksize)
+    grouped['months'] = [calendar.month_abbr[month] for month in grouped['month']]
 
     months_str = grouped['months'].tolist()
 
@@ -95,44 +98,21 @@ def get_risk_plotly_figure(uploaded_file, year="All", height=500, width=900):
 
     return fig
 
-def get_account_age_plotly_figure_by_affiliation(uploaded_file, year_range=None, height=400, width=600):
-    # Accept both file path and uploaded file-like object
-    if hasattr(uploaded_file, "read"):
-        uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file)
-        uploaded_file.seek(0)
-    else:
-        df = pd.read_csv(uploaded_file)
-
-    # Ensure fecha_afiliacion exists and parse year
-    if 'fecha_afiliacion' not in df.columns:
-        raise ValueError("Column 'fecha_afiliacion' not found in data.")
-    df['afiliacion_year'] = pd.to_datetime(df['fecha_afiliacion']).dt.year
-
-    # Filter by year range if provided
-    if year_range:
-        df = df[(df['afiliacion_year'] >= year_range[0]) & (df['afiliacion_year'] <= year_range[1])]
-    
-    # Create a new column for account age in years
-    if 'account_age_years' not in df.columns:
-        if 'fecha_afiliacion' in df.columns:
-            df['fecha_afiliacion'] = pd.to_datetime(df['fecha_afiliacion'], errors='coerce')
-            df['account_age_years'] = (pd.Timestamp.now() - df['fecha_afiliacion']).dt.days / 365.25
-        else:
-            raise ValueError("Column 'account_age_years' or 'fecha_afiliacion' not found in data.")
-
-    # Assume 'account_age_years' column exists
-    if 'account_age_years' not in df.columns:
-        raise ValueError("Column 'account_age_years' not found in data.")
-
-    # Bin account ages
-    bins = [0, 1, 3, np.inf]
-    labels = ['< 1 year', '1-3 years', '> 3 years']
-    df['age_group'] = pd.cut(df['account_age_years'], bins=bins, labels=labels, right=False)
-
-    # Count unique accounts per group
-    grouped = df.groupby('age_group', observed=False)['external_account_id'].nunique().reset_index()
-    grouped = grouped.rename(columns={'external_account_id': 'account_count'})
+def affiliation_year_range(uploaded_file):
+    # (first, last) affiliation year in the dataset: the default year_range
+    # of the account age figure
+    return get_affiliation_days(uploaded_file).year_range()
+
+def account_age_counts(uploaded_file, year_range=None, as_of=None):
+    # Unique accounts per account age group (< 1, 1-3, > 3 years as of
+    # `as_of`, default today), for accounts affiliated within year_range
+    # (inclusive). Slices of the precomputed affiliation-day dimension.
+    return get_affiliation_days(uploaded_file).age_group_counts(as_of=as_of, year_range=year_range)
+
+@cached_figure(daily=True)
+def get_account_age_plotly_figure_by_affiliation(uploaded_file, year_range=None, height=400, width=600, as_of=None):
+    with span("account age counts"):
+        grouped = account_age_counts(uploaded_file, year_range=year_range, as_of=as_of)
 
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -0,0 +1,65 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from dataLoader import DEFAULT_CSV_PATH
+from dataCube import get_cube, mean
+
+KPI_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kpis.json")
+
+# KPIs per cube version (dataset fingerprint, or live feed position); a few
+# recent versions are kept so live ticks do not grow it without bound
+_MAX_VERSIONS = 8
+_kpis = OrderedDict()
+_lock = threading.Lock()
+
+
+def _quarter_key(year, quarter):
+    return f"{int(year)}Q{int(quarter)}"
+
+
+def compute_kpis(uploaded_file=DEFAULT_CSV_PATH, chunksize=None):
+    # All Insights Hub metrics, from roll-ups of the dataset cube: the only
+    # pass over the rows is the (vectorized, shared) cube build
+    cube = get_cube(uploaded_file, chunksize=chunksize)
+    if cube.version is not None and cube.version in _kpis:
+        return _kpis[cube.version]
+
+    totals = cube.total()
+    per_quarter = cube.rollup(["year", "quarter"])
+    per_payment = cube.rollup(["medio_pago"])
+    kpis = {
+        "Loan Approval Rate": float(mean(totals, "approved").iloc[0]),
+        "Delinquency Rate": float(mean(totals, "ever_delinquent").iloc[0]),
+        "Loan Requests per Quarter": {
+            _quarter_key(year, quarter): int(n)
+            for year, quarter, n in per_quarter[["year", "quarter", "n"]].itertuples(index=False)
+        },
+        # Share of the quarter's approved loans whose client never went delinquent
+        "Loan Repayment Rate per Quarter": {
+            _quarter_key(year, quarter): float(repaid / approved) if approved else 0.0
+            for year, quarter, repaid, approved in per_quarter[["year", "quarter", "repaid_sum", "approved_sum"]].itertuples(index=False)
+        },
+        "Average Purchase Value by Payment Type": {
+            str(payment): float(value)
+            for payment, value in zip(per_payment["medio_pago"], mean(per_payment, "total_importe"))
+        },
+    }
+
+    if cube.version is not None:
+        with _lock:
+            _kpis[cube.version] = kpis
+            while len(_kpis) > _MAX_VERSIONS:
+                _kpis.popitem(last=False)
+    return kpis
+
+
+def write_kpis_json(uploaded_file=DEFAULT_CSV_PATH, path=KPI_JSON_PATH):
+    # Regenerates the kpis.json artifact from the data
+    with open(path, "w") as f:
+        json.dump(compute_kpis(uploaded_file), f, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    print(write_kpis_json())
@@ -0,0 +1,66 @@
+import sys
+import time
+import logging
+import importlib
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# Modules the app loads on demand, in the order a cold start reaches them
+STARTUP_MODULES = [
+    "pandas",
+    "pyarrow",
+    "plotly.graph_objects",
+    "streamlit",
+    "streamlit_option_menu",
+    "dataLoader",
+    "dataCube",
+    "kpiEngine",
+    "liveIngest",
+    "figureCache",
+    "graphImporte",
+    "graphRisk",
+    "pages.Acerca_de",
+    "pages.Key_Findings",
+    "pages.User_Persona_Dashboard",
+    "pages.Meet_Nexus",
+    "pages.ML_Models",
+]
+
+# Seconds each module took the first time it was loaded through load_module
+import_times = {}
+
+
+def load_module(name):
+    # Imports a module on first use (e.g. when its menu entry is first
+    # selected) and records how long that took. Always goes through
+    # import_module: a module is in sys.modules before its body has run, and
+    # only the import machinery waits for another thread still executing it.
+    first = name not in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if first:
+        import_times[name] = time.perf_counter() - start
+        logger.info("Imported %s on demand in %.1f ms", name, import_times[name] * 1000)
+    return module
+
+
+def isolated_import_time(name):
+    # Cold import cost of one module (with its dependencies) in a fresh interpreter
+    code = (
+        "import time, importlib; start = time.perf_counter(); "
+        f"importlib.import_module({name!r}); print(time.perf_counter() - start)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def import_report(modules=STARTUP_MODULES):
+    # (module, isolated cold import seconds), most expensive first
+    return sorted(((name, isolated_import_time(name)) for name in modules), key=lambda item: -item[1])
+
+
+if __name__ == "__main__":
+    # Startup import-time report: python lazyImport.py
+    for name, seconds in import_report():
+        print(f"{name:<32} {seconds * 1000:8.1f} ms")
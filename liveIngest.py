@@ -0,0 +1,86 @@
+import io
+import os
+import json
+import threading
+import pandas as pd
+from dataLoader import DEFAULT_CSV_PATH, apply_schema, read_csv_typed, fold_partials
+from dataCube import CUBE_DIMENSIONS, DataCube, get_cube, aggregate_cells
+
+# Append-only event source (CSV with a header line, or JSON Lines) that new loan
+# requests are written to. Unset: the dashboard shows the static snapshot.
+LIVE_SOURCE = os.environ.get("NEXUS_LIVE_SOURCE") or None
+# Seconds between partial reruns of the live charts in every open session
+LIVE_REFRESH_SECONDS = int(os.environ.get("NEXUS_LIVE_REFRESH_SECONDS", "15"))
+
+# One feed per (event source, snapshot) pair, shared by every session
+_feeds = {}
+_lock = threading.Lock()
+
+
+class LiveFeed:
+    # Tails an append-only file and folds each batch of new rows into a copy
+    # of the snapshot cube, so every tick costs O(new rows + cube cells)
+
+    def __init__(self, source, base_path=DEFAULT_CSV_PATH):
+        self.source = source
+        self.base_path = base_path
+        self.is_jsonl = os.path.splitext(source)[1].lower() in (".jsonl", ".ndjson")
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        base = get_cube(self.base_path)
+        self.base_version = base.version
+        self.cube = DataCube(base.cells, version=(base.version, 0))
+        self.offset = 0
+        self.header = None
+        self.rows_ingested = 0
+
+    def _parse(self, lines):
+        if self.is_jsonl:
+            records = [json.loads(line) for line in lines.splitlines() if line.strip()]
+            return apply_schema(pd.DataFrame.from_records(records))
+        return read_csv_typed(io.StringIO(self.header + lines))
+
+    def poll(self):
+        # Ingests whatever complete lines were appended since the last poll
+        with self._lock:
+            try:
+                size = os.path.getsize(self.source)
+            except FileNotFoundError:
+                return 0
+            if size < self.offset or get_cube(self.base_path).version != self.base_version:
+                # Source truncated/rotated or snapshot replaced: start over
+                self._reset()
+            if size == self.offset:
+                return 0
+
+            with open(self.source, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            # Leave a trailing partial line for the next poll
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                return 0
+            self.offset += end
+            lines = data[:end].decode("utf-8")
+            if not self.is_jsonl and self.header is None:
+                self.header, _, lines = lines.partition("\n")
+                self.header += "\n"
+            if not lines.strip():
+                return 0
+
+            rows = self._parse(lines)
+            cells = fold_partials(self.cube.cells.set_index(CUBE_DIMENSIONS), aggregate_cells(rows))
+            self.rows_ingested += len(rows)
+            self.cube = DataCube(cells.reset_index(), version=(self.base_version, self.rows_ingested))
+            return len(rows)
+
+
+def get_feed(source=LIVE_SOURCE, base_path=DEFAULT_CSV_PATH):
+    key = (os.path.abspath(source), os.path.abspath(base_path))
+    with _lock:
+        if key not in _feeds:
+            _feeds[key] = LiveFeed(*key)
+        return _feeds[key]
+
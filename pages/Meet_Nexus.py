@@ -1,16 +1,18 @@
 import streamlit as st
 import os
+from assetPipeline import picture_html
 
 def main():
     st.markdown("<h1 style='text-align: center;'>Meet Nexus</h1>", unsafe_allow_html=True)
     st.markdown(" ")
 
     # Center the team image
-    team_url = "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/team.png?raw=true"
+    # Images are served locally in resized variants (see assetPipeline.py)
+    team_img = picture_html("team", alt="Team Nexus", style="max-width: 1300px; width: 100%;", sizes="(max-width: 1300px) 100vw, 1300px", eager=True)
     st.markdown(
         f"""
         <div style='display: flex; justify-content: center;'>
-            <img src="{team_url}" style="max-width: 1300px; width: 100%;" />
+            {team_img}
         </div>
         """,
         unsafe_allow_html=True,
@@ -25,11 +27,11 @@ def main():
     # 5 columns for team members
     cols = st.columns(5)
     team_files = [
-        ("https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Andy.jpg?raw=true", "Andrea Alvarado"),
-        ("https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Dany.png?raw=true", "Daniela Hernández"),
-        ("https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Emi.png?raw=true", "Emiliano Salinas"),
-        ("https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Jorge.png?raw=true", "Jorge Mata"),
-        ("https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/Luis.png?raw=true", "Luis Manzanares"),
+        ("andy", "Andrea Alvarado"),
+        ("dany", "Daniela Hernández"),
+        ("emi", "Emiliano Salinas"),
+        ("jorge", "Jorge Mata"),
+        ("luis", "Luis Manzanares"),
     ]
 
     # LinkedIn URLs for each team member
@@ -52,11 +54,12 @@ def main():
     </div>
     """
 
-    for col, (img_url, name), url in zip(cols, team_files, linkedin_urls):
+    for col, (asset, name), url in zip(cols, team_files, linkedin_urls):
+        member_img = picture_html(asset, alt=name, style="width: 100%; max-width: 400px; border-radius: 8px;", sizes="(max-width: 640px) 100vw, 20vw")
         col.markdown(
             f"""
             <div style='display: flex; justify-content: center;'>
-                <img src="{img_url}" style="width: 100%; max-width: 400px; border-radius: 8px;" />
+                {member_img}
             </div>
             """,
             unsafe_allow_html=True
@@ -65,11 +68,11 @@ def main():
         col.markdown(linkedin_icon_template.format(url=url), unsafe_allow_html=True)
 
     st.markdown("---")
-    tagline_url = "https://github.com/jorge-mata/DataAnalytics_Dashboard_Streamlit/blob/main/img/tagline.jpeg?raw=true"
+    tagline_img = picture_html("tagline", alt="Nexus tagline", style="max-width: 1600px; width: 100%; border-radius: 8px;", sizes="(max-width: 1600px) 100vw, 1600px")
     st.markdown(
         f"""
         <div style='display: flex; justify-content: center;'>
-            <img src="{tagline_url}" style="max-width: 1600px; width: 100%; border-radius: 8px;" />
+            {tagline_img}
         </div>
         """,
         unsafe_allow_html=True,
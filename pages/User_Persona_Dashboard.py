@@ -1,8 +1,21 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 import os
+import time
+from dataCube import get_cube
+from riskProfile import risk_summary, seasonality_summary
+from rawViewer import PAGE_SIZES, DERIVED_COLUMNS, viewer_columns, selection_size, raw_page
+from dataExport import EXPORT_FORMATS, EXPORT_TTL_SECONDS, new_export, write_selection
+from categoryDims import category_hierarchy, category_group_counts, payment_display
+from perfTrace import span
+
+def section_opened(name):
+    # Collapsed sections are computed and sent only once opened. The open state
+    # is kept outside the widget key so it survives reruns and page switches.
+    state_key = f"risk_section_open_{name}"
+    opened = st.toggle("Toggle", value=st.session_state.get(state_key, False), key=f"risk_section_toggle_{name}")
+    st.session_state[state_key] = opened
+    return opened
 
 def main():
     st.title("Risk Management Dashboard")
@@ -28,238 +41,264 @@ def main():
 
     # Load data
     DATA_PATH = os.path.join(os.path.dirname(__file__), '../Data/aggregated_df.csv')
-    df = pd.read_csv(DATA_PATH)
-
-    # Preprocessing
-    df['fecha_afiliacion'] = pd.to_datetime(df['fecha_afiliacion'])
-    df['days_since_affiliation'] = (pd.Timestamp.today() - df['fecha_afiliacion']).dt.days
+    # Charts are answered from the pre-aggregated cube, built once per dataset version
+    cube = get_cube(DATA_PATH)
 
     # Top filters (not sidebar)
-    with st.container():
-        col1, col3 = st.columns([1, 2])  # Adjust column widths after removing col2
-        with col1:
-            # Map 0 and 1 to "No Risk" and "Risk" for display purposes
-            riskclient_map = {0: "No Risk", 1: "Risk"}
-            risk_levels = sorted(df['riskclient'].unique())  # Ensure risk_levels contains the original values (0 and 1)
-            risk_levels_display = [riskclient_map[risk] for risk in risk_levels]
-            selected_risk_display = st.multiselect("Risk Level", risk_levels_display, default=risk_levels_display)
+    with span("filters"):
+        with st.container():
+            col1, col3 = st.columns([1, 2])  # Adjust column widths after removing col2
+            with col1:
+                # Map 0 and 1 to "No Risk" and "Risk" for display purposes
+                riskclient_map = {0: "No Risk", 1: "Risk"}
+                risk_levels = cube.dimension_values('riskclient')  # Ensure risk_levels contains the original values (0 and 1)
+                risk_levels_display = [riskclient_map[risk] for risk in risk_levels]
+                selected_risk_display = st.multiselect("Risk Level", risk_levels_display, default=risk_levels_display)
 
-            # Reverse map the selected display values back to 0 and 1 for filtering
-            selected_risk = [key for key, value in riskclient_map.items() if value in selected_risk_display]
+                # Reverse map the selected display values back to 0 and 1 for filtering
+                selected_risk = [key for key, value in riskclient_map.items() if value in selected_risk_display]
 
-        with col3:
-            # Remove the "item_" prefix from the 'most_purchased_category' column for display purposes
-            category_display = df['most_purchased_category'].str.replace('item_', '', regex=False).unique()
-            category_mapping = dict(zip(category_display, df['most_purchased_category'].unique()))  # Map cleaned names back to original
+            with col3:
+                # Remove the "item_" prefix from the 'most_purchased_category' column for display purposes
+                categories = cube.dimension_values('most_purchased_category')
+                category_display, _, _ = category_hierarchy(tuple(categories))
+                category_mapping = dict(zip(category_display, categories))  # Map cleaned names back to original
 
-            # Display the cleaned category names in the multiselect
-            selected_category_display = st.multiselect(
-                "Most Purchased Category",
-                options=category_display,
-                default=category_display
-            )
+                # Display the cleaned category names in the multiselect
+                selected_category_display = st.multiselect(
+                    "Most Purchased Category",
+                    options=category_display,
+                    default=category_display
+                )
 
-            # Reverse map the selected display values back to the original values for filtering
-            category_filter = [category_mapping[display] for display in selected_category_display]
+                # Reverse map the selected display values back to the original values for filtering
+                category_filter = [category_mapping[display] for display in selected_category_display]
 
-    # Apply filters to the DataFrame
-    filtered_df = df[df['riskclient'].isin(selected_risk)]
+    # Apply filters to the cube cells; every chart below is a roll-up of them
+    where = {'riskclient': selected_risk}
     if category_filter:
-        filtered_df = filtered_df[filtered_df['most_purchased_category'].isin(category_filter)]
+        where['most_purchased_category'] = category_filter
 
     st.markdown("### Risk Profile Overview")
-    risk_summary = filtered_df.groupby('riskclient').agg(
-        num_loans=('loan_request_id', 'count'),
-        approval_rate=('approved', 'mean'),
-        avg_importe=('total_importe', 'mean'),
-        avg_delinquencies=('num_delinquencies', 'mean'),
-        ever_delinquent_rate=('ever_delinquent', 'mean')
-    ).reset_index()
+    with span("risk profile overview"):
+        risk_profile = risk_summary(DATA_PATH, where)
 
-    # Update the labels for the graphs to display "No Risk" and "Risk"
-    riskclient_map = {0: "No Risk", 1: "Risk"}
+        # Update the labels for the graphs to display "No Risk" and "Risk"
+        riskclient_map = {0: "No Risk", 1: "Risk"}
 
-    # First row of charts
-    with st.expander("Toggle", expanded=True):
-        col1, col2 = st.columns([1, 1], gap="large")
-        with col1:
-            colors = ["#824d74", "#be7b72"]
-            st.markdown("<div style='text-align: center;'><b>Number of Loans by Risk Level</b></div>", unsafe_allow_html=True)
-            fig = go.Figure(go.Pie(
-                labels=risk_summary['riskclient'].map(riskclient_map),  # Map 0/1 to "No Risk"/"Risk"
-                values=risk_summary['num_loans'],
-                marker=dict(colors=colors),
-                textinfo='label+percent',
-                textfont=dict(color='white', size=22),
-                insidetextfont=dict(color='white', size=22),
-                hole=0,
-            ))
-            fig.update_layout(
-                height=400,
-                width=400,
-                margin=dict(l=0, r=0, t=40, b=0),
-                showlegend=True,
-                legend=dict(font=dict(size=16), orientation="h", y=-0.1, x=0.5, xanchor="center"),
-            )
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            risk1_df = risk_summary[risk_summary['riskclient'] == 1]
-            if not risk1_df.empty:
-                risk1_rate = risk1_df['ever_delinquent_rate'].iloc[0] * 100  # as percentage
-                st.markdown("#### Ever Delinquent Rate")
-                fig_gauge = go.Figure(go.Indicator(
-                    mode="gauge+number",
-                    value=risk1_rate,
-                    number={'suffix': "%"},
-                    gauge={
-                        'axis': {'range': [0, 100]},
-                        'bar': {'color': "#be7b72"},
-                        'steps': [
-                            {'range': [0, 50], 'color': "#f0e6e6"},
-                            {'range': [50, 100], 'color': "#f5cccc"}
-                        ],
-                    },
-                    title={'text': "Percentage of Payments not Paid"}
+        # First row of charts
+        with st.expander("Toggle", expanded=True):
+            col1, col2 = st.columns([1, 1], gap="large")
+            with col1:
+                colors = ["#824d74", "#be7b72"]
+                st.markdown("<div style='text-align: center;'><b>Number of Loans by Risk Level</b></div>", unsafe_allow_html=True)
+                fig = go.Figure(go.Pie(
+                    labels=risk_profile['riskclient'].map(riskclient_map),  # Map 0/1 to "No Risk"/"Risk"
+                    values=risk_profile['num_loans'],
+                    marker=dict(colors=colors),
+                    textinfo='label+percent',
+                    textfont=dict(color='white', size=22),
+                    insidetextfont=dict(color='white', size=22),
+                    hole=0,
                 ))
-                st.plotly_chart(fig_gauge, use_container_width=True)
-            else:
-                st.info("No data for Risk Level 1 in current filter.")
+                fig.update_layout(
+                    height=400,
+                    width=400,
+                    margin=dict(l=0, r=0, t=40, b=0),
+                    showlegend=True,
+                    legend=dict(font=dict(size=16), orientation="h", y=-0.1, x=0.5, xanchor="center"),
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+            with col2:
+                risk1_df = risk_profile[risk_profile['riskclient'] == 1]
+                if not risk1_df.empty:
+                    risk1_rate = risk1_df['ever_delinquent_rate'].iloc[0] * 100  # as percentage
+                    st.markdown("#### Ever Delinquent Rate")
+                    fig_gauge = go.Figure(go.Indicator(
+                        mode="gauge+number",
+                        value=risk1_rate,
+                        number={'suffix': "%"},
+                        gauge={
+                            'axis': {'range': [0, 100]},
+                            'bar': {'color': "#be7b72"},
+                            'steps': [
+                                {'range': [0, 50], 'color': "#f0e6e6"},
+                                {'range': [50, 100], 'color': "#f5cccc"}
+                            ],
+                        },
+                        title={'text': "Percentage of Payments not Paid"}
+                    ))
+                    st.plotly_chart(fig_gauge, use_container_width=True)
+                else:
+                    st.info("No data for Risk Level 1 in current filter.")
 
     # Second row of charts
     st.markdown("### Category and Payment Analysis")
-    with st.expander("Toggle", expanded=False):
-        col3, col4 = st.columns(2)
-        with col3:
-            st.markdown("#### Most Purchased Category by Risk Level")
-            category_by_risk = filtered_df.groupby(['riskclient', 'most_purchased_category']).size().reset_index(name='count')
-
-            # Remove the "item_" prefix and group by the first word before underscore
-            category_by_risk['most_purchased_category_clean'] = category_by_risk['most_purchased_category'].str.replace('item_', '', regex=False)
-            category_by_risk['category_group'] = category_by_risk['most_purchased_category_clean'].str.split('_').str[0].str.capitalize()
-
-            # Group by riskclient and category_group, summing counts
-            grouped = category_by_risk.groupby(['riskclient', 'category_group'], as_index=False)['count'].sum()
+    with span("category and payment analysis"):
+        if section_opened("category_payment"):
+            col3, col4 = st.columns(2)
+            with col3:
+                st.markdown("#### Most Purchased Category by Risk Level")
+                category_by_risk = cube.rollup(['riskclient', 'most_purchased_category'], where=where)
 
-            # Group categories with counts < 10 for both "Risk" and "No Risk" into "Otros"
-            grouped_data = []
-            for group in grouped['category_group'].unique():
-                group_data = grouped[grouped['category_group'] == group]
-                risk_counts = group_data.groupby('riskclient')['count'].sum()
-                if all(risk_counts < 10):
-                    for risk in risk_counts.index:
-                        grouped_data.append({'riskclient': risk, 'category_group': 'Otros', 'count': risk_counts[risk]})
-                else:
-                    grouped_data.extend(group_data.to_dict('records'))
+                # Precomputed category -> group hierarchy; groups with fewer than 10
+                # loans at every risk level are folded into "Otros"
+                category_by_risk_grouped = category_group_counts(category_by_risk, min_count=10)
 
-            # Convert grouped data back to a DataFrame
-            category_by_risk_grouped = pd.DataFrame(grouped_data)
-            # Aggregate counts for "Otros" to ensure it is summed up properly
-            category_by_risk_grouped = category_by_risk_grouped.groupby(['riskclient', 'category_group'], as_index=False).agg({'count': 'sum'})
+                fig3 = go.Figure()
+                for i, risk in enumerate(risk_levels):
+                    df_risk = category_by_risk_grouped[category_by_risk_grouped['riskclient'] == risk]
+                    fig3.add_trace(go.Bar(
+                        x=df_risk['category_group'],
+                        y=df_risk['count'],
+                        name=riskclient_map[risk],
+                        marker_color=colors[i % len(colors)]
+                    ))
 
-            fig3 = go.Figure()
-            for i, risk in enumerate(risk_levels):
-                df_risk = category_by_risk_grouped[category_by_risk_grouped['riskclient'] == risk]
-                fig3.add_trace(go.Bar(
-                    x=df_risk['category_group'],
-                    y=df_risk['count'],
-                    name=riskclient_map[risk],
-                    marker_color=colors[i % len(colors)]
-                ))
+                fig3.update_layout(
+                    title='Most Purchased Category by Risk Level',
+                    xaxis_title='Category Group',
+                    yaxis_title='Count',
+                    barmode='stack'
+                )
+                st.plotly_chart(fig3, use_container_width=True)
 
-            fig3.update_layout(
-                title='Most Purchased Category by Risk Level',
-                xaxis_title='Category Group',
-                yaxis_title='Count',
-                barmode='stack'
-            )
-            st.plotly_chart(fig3, use_container_width=True)
-
-        with col4:
-            st.markdown("#### Payment Method by Risk Level")
-            payment_method_by_risk = filtered_df.groupby(['riskclient', 'medio_pago']).size().reset_index(name='count')
-            # Capitalize the first letter of each payment method
-            payment_method_by_risk['medio_pago'] = payment_method_by_risk['medio_pago'].astype(str).str.capitalize()
+            with col4:
+                st.markdown("#### Payment Method by Risk Level")
+                payment_method_by_risk = cube.rollup(['riskclient', 'medio_pago'], where=where)
+                payment_method_by_risk = payment_method_by_risk[['riskclient', 'medio_pago', 'n']].rename(columns={'n': 'count'})
+                # Capitalize the first letter of each payment method (labels precomputed per method)
+                payment_method_by_risk['medio_pago'] = payment_display(payment_method_by_risk['medio_pago'])
             
-            fig4 = go.Figure()
-            for i, risk in enumerate(risk_levels):
-                df_risk = payment_method_by_risk[payment_method_by_risk['riskclient'] == risk]
-                fig4.add_trace(go.Bar(
-                    x=df_risk['medio_pago'],
-                    y=df_risk['count'],
-                    name=riskclient_map[risk],  # Map 0/1 to "No Risk"/"Risk"
-                    marker_color=colors[i % len(colors)]
-                ))
+                fig4 = go.Figure()
+                for i, risk in enumerate(risk_levels):
+                    df_risk = payment_method_by_risk[payment_method_by_risk['riskclient'] == risk]
+                    fig4.add_trace(go.Bar(
+                        x=df_risk['medio_pago'],
+                        y=df_risk['count'],
+                        name=riskclient_map[risk],  # Map 0/1 to "No Risk"/"Risk"
+                        marker_color=colors[i % len(colors)]
+                    ))
             
-            fig4.update_layout(
-                title='Payment Method by Risk Level',
-                xaxis_title='Payment Method',
-                yaxis_title='Count',
-                barmode='stack'
-            )
-            st.plotly_chart(fig4, use_container_width=True)
+                fig4.update_layout(
+                    title='Payment Method by Risk Level',
+                    xaxis_title='Payment Method',
+                    yaxis_title='Count',
+                    barmode='stack'
+                )
+                st.plotly_chart(fig4, use_container_width=True)
 
     # Third row of charts
     st.markdown("### Tenure and Seasonality Analysis")
-    with st.expander("Toggle", expanded=False):
-        col5, col6 = st.columns(2)
-        with col5:
-            st.markdown("#### Client Tenure vs. Risk")
-            tenure_by_risk = filtered_df.groupby('riskclient')['days_since_affiliation'].mean().reset_index()
+    with span("tenure and seasonality analysis"):
+        if section_opened("tenure_seasonality"):
+            col5, col6 = st.columns(2)
+            with col5:
+                st.markdown("#### Client Tenure vs. Risk")
+                tenure_by_risk = risk_profile[['riskclient', 'days_since_affiliation']]
             
-            fig5 = go.Figure()
-            for i, risk in enumerate(risk_levels):
-                df_risk = tenure_by_risk[tenure_by_risk['riskclient'] == risk]
-                fig5.add_trace(go.Bar(
-                    x=[riskclient_map[risk]],  # Map 0/1 to "No Risk"/"Risk"
-                    y=df_risk['days_since_affiliation'],
-                    name=riskclient_map[risk],  # Map 0/1 to "No Risk"/"Risk"
-                    marker_color=colors[i % len(colors)]
-                ))
+                fig5 = go.Figure()
+                for i, risk in enumerate(risk_levels):
+                    df_risk = tenure_by_risk[tenure_by_risk['riskclient'] == risk]
+                    fig5.add_trace(go.Bar(
+                        x=[riskclient_map[risk]],  # Map 0/1 to "No Risk"/"Risk"
+                        y=df_risk['days_since_affiliation'],
+                        name=riskclient_map[risk],  # Map 0/1 to "No Risk"/"Risk"
+                        marker_color=colors[i % len(colors)]
+                    ))
             
-            fig5.update_layout(
-                title='Average Days Since Affiliation by Risk Level',
-                xaxis_title='Risk Level',
-                yaxis_title='Days Since Affiliation',
-                barmode='group'
-            )
-            st.plotly_chart(fig5, use_container_width=True)
+                fig5.update_layout(
+                    title='Average Days Since Affiliation by Risk Level',
+                    xaxis_title='Risk Level',
+                    yaxis_title='Days Since Affiliation',
+                    barmode='group'
+                )
+                st.plotly_chart(fig5, use_container_width=True)
 
-        with col6:
-            st.markdown("#### Seasonality Analysis")
-            # Group by 'riskclient' and 'es_temporada_alta_real' to calculate the required metrics
-            seasonality = filtered_df.groupby(['riskclient', 'es_temporada_alta_real']).agg(
-                num_loans=('loan_request_id', 'count'),
-                avg_importe=('total_importe', 'mean'),
-                avg_delinquencies=('num_delinquencies', 'mean')
-            ).reset_index()
-            seasonality['seasonality_label'] = seasonality['es_temporada_alta_real'].map({1: 'High', 0: 'Low'})
+            with col6:
+                st.markdown("#### Seasonality Analysis")
+                # Loans per risk level and season, from the cube
+                seasonality = seasonality_summary(DATA_PATH, where)
             
-            fig6 = go.Figure()
-            for i, season in enumerate(['High', 'Low']):
-                df_season = seasonality[seasonality['seasonality_label'] == season]
-                fig6.add_trace(go.Bar(
-                    x=df_season['riskclient'].map(riskclient_map),
-                    y=df_season['num_loans'],
-                    name=season,
-                    marker_color=colors[i % len(colors)],
-                    customdata=df_season['seasonality_label'],
-                    hovertemplate="<b>Risk Level:</b> %{x}<br><b>Seasonality:</b> %{customdata}<br><b>Number of Loans:</b> %{y}<extra></extra>"
-                ))
+                fig6 = go.Figure()
+                for i, season in enumerate(['High', 'Low']):
+                    df_season = seasonality[seasonality['seasonality_label'] == season]
+                    fig6.add_trace(go.Bar(
+                        x=df_season['riskclient'].map(riskclient_map),
+                        y=df_season['num_loans'],
+                        name=season,
+                        marker_color=colors[i % len(colors)],
+                        customdata=df_season['seasonality_label'],
+                        hovertemplate="<b>Risk Level:</b> %{x}<br><b>Seasonality:</b> %{customdata}<br><b>Number of Loans:</b> %{y}<extra></extra>"
+                    ))
             
-            fig6.update_layout(
-                title='Loans by Risk Level and Seasonality',
-                xaxis_title='Risk Level',
-                yaxis_title='Number of Loans',
-                barmode='group',
-                legend_title_text='Seasonality'
-            )
-            st.plotly_chart(fig6, use_container_width=True)
+                fig6.update_layout(
+                    title='Loans by Risk Level and Seasonality',
+                    xaxis_title='Risk Level',
+                    yaxis_title='Number of Loans',
+                    barmode='group',
+                    legend_title_text='Seasonality'
+                )
+                st.plotly_chart(fig6, use_container_width=True)
 
-    # Show filtered raw data in a collapsed expander
+    # Show filtered raw data in a collapsed section
     st.markdown("### Filtered Raw Data")
-    with st.expander("Toggle", expanded=False):
-        st.dataframe(filtered_df)
+    with span("filtered raw data"):
+        if section_opened("raw_data"):
+            # Rows stay server-side: the selection comes from the shared bitmap
+            # index and only the current page (and chosen columns) is sent
+            all_columns = viewer_columns(DATA_PATH)
+            shown_columns = st.multiselect("Columns", options=all_columns, default=all_columns, key="raw_columns")
+            sort_col, order_col, size_col = st.columns([2, 1, 1])
+            with sort_col:
+                sort_by = st.selectbox("Sort by", options=["(none)"] + all_columns, key="raw_sort_by")
+            with order_col:
+                ascending = st.radio("Order", options=["Ascending", "Descending"], horizontal=True, key="raw_order") == "Ascending"
+            with size_col:
+                page_size = st.selectbox("Rows per page", options=PAGE_SIZES, key="raw_page_size")
+
+            n_selected, n_total = selection_size(DATA_PATH, where)
+            n_pages = max(1, -(-n_selected // page_size))
+            if st.session_state.get("raw_page", 1) > n_pages:
+                st.session_state["raw_page"] = n_pages
+            page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, step=1, key="raw_page")
+
+            page_df = raw_page(
+                DATA_PATH, where, page=page, page_size=page_size,
+                sort_by=None if sort_by == "(none)" else sort_by, ascending=ascending, columns=shown_columns,
+            )
+            first = (page - 1) * page_size
+            st.caption(f"Rows {min(first + 1, n_selected):,}–{first + len(page_df):,} of {n_selected:,} matching ({n_total:,} total)")
+            st.dataframe(page_df)
+
+            # Exports stream the whole selection to a file in bounded chunks
+            export_col, button_col = st.columns([3, 1])
+            with export_col:
+                export_format = st.radio("Export format", options=list(EXPORT_FORMATS), horizontal=True, key="raw_export_format")
+            with button_col:
+                export_clicked = st.button("Export selection", key="raw_export")
+            export_columns = [c for c in shown_columns if c not in DERIVED_COLUMNS]
+            export_key = (tuple((dim, tuple(values)) for dim, values in sorted(where.items())), tuple(export_columns))
+            if export_clicked:
+                fmt = EXPORT_FORMATS[export_format]
+                file_path, url = new_export(fmt)
+                progress = st.progress(0, text="Exporting...")
+                for written, total in write_selection(file_path, DATA_PATH, where, fmt=fmt, columns=export_columns):
+                    progress.progress(written / total if total else 1.0, text=f"Exported {written:,} of {total:,} rows")
+                # Kept so the link survives later reruns, but only while it still
+                # matches the selection and columns and the export is not expired
+                st.session_state["raw_export_link"] = {
+                    "key": export_key,
+                    "created": time.time(),
+                    "html": f'<a href="{url}" download="{os.path.basename(file_path)}">Download {export_format} ({n_selected:,} rows)</a>',
+                }
+            link = st.session_state.get("raw_export_link")
+            if link is not None and (link["key"] != export_key or time.time() - link["created"] >= EXPORT_TTL_SECONDS):
+                del st.session_state["raw_export_link"]
+                link = None
+            if link is not None:
+                st.markdown(link["html"], unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
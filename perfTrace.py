@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+
+# When set, every instrumented rerun also writes its spans to this directory
+# as a Chrome trace file (chrome://tracing, Perfetto)
+TRACE_DIR = os.environ.get("NEXUS_PERF_TRACE_DIR")
+
+# Spans of the rerun running in this thread; None (the default) disables
+# instrumentation, leaving span() a single lookup
+_recorder = contextvars.ContextVar("nexus_perf_recorder", default=None)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = self.recorder.depth
+        self.recorder.depth += 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.recorder.depth -= 1
+        self.recorder.spans.append((self.name, self.start, end, self.depth, self.args))
+        return False
+
+
+class Recorder:
+    # Timing spans of one rerun: (name, start ns, end ns, nesting depth, args)
+
+    def __init__(self, name="rerun"):
+        self.name = name
+        self.started = time.perf_counter_ns()
+        self.wall_time = time.time()
+        self.thread = threading.get_ident()
+        self.spans = []
+        self.depth = 0
+
+    def span(self, name, args):
+        return _Span(self, name, args)
+
+    def timeline(self):
+        # Spans in start order, with times in ms relative to the rerun start
+        return [
+            {"name": name, "start_ms": (start - self.started) / 1e6, "duration_ms": (end - start) / 1e6, "depth": depth, "args": args}
+            for name, start, end, depth, args in sorted(self.spans, key=lambda s: (s[1], s[3]))
+        ]
+
+    def chrome_trace(self):
+        # Chrome trace event format: one complete ("X") event per span
+        events = [
+            {"name": name, "cat": "nexus", "ph": "X", "ts": (start - self.started) / 1e3, "dur": (end - start) / 1e3,
+             "pid": os.getpid(), "tid": self.thread, "args": {key: str(value) for key, value in args.items()}}
+            for name, start, end, depth, args in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"rerun": self.name, "time": self.wall_time}}
+
+    def write_chrome_trace(self, directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"nexus-{self.name}-{int(self.wall_time * 1000)}-{self.thread}.json")
+        with open(path, "w") as fh:
+            json.dump(self.chrome_trace(), fh)
+        return path
+
+
+def span(name, **args):
+    # Times the enclosed block when the current rerun is instrumented
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NO_SPAN
+    return recorder.span(name, args)
+
+
+def start_rerun(enabled, name="rerun"):
+    # Starts (or, when disabled, switches off) instrumentation for the rerun
+    # running in this thread; returns its Recorder or None
+    recorder = Recorder(name) if enabled else None
+    _recorder.set(recorder)
+    return recorder
+
+
+def cache_stats():
+    # Hit/miss counters of this process's result caches. The API's cache only
+    # exists where queryApi is loaded (it normally runs as its own process).
+    from figureCache import figure_cache
+
+    stats = {"figures": figure_cache.stats()}
+    query_api = sys.modules.get("queryApi")
+    if query_api is not None:
+        stats["API results"] = query_api.result_cache.stats()
+    return stats
+
+
+def render_panel(recorder):
+    # Developer panel: waterfall of the current rerun, cache counters and a
+    # Chrome trace download
+    import streamlit as st
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    _recorder.set(None)
+    if TRACE_DIR:
+        recorder.write_chrome_trace()
+    timeline = recorder.timeline()
+    total_ms = (time.perf_counter_ns() - recorder.started) / 1e6
+    with st.expander(f"Performance: {total_ms:,.1f} ms, {len(timeline)} spans", expanded=True):
+        labels = [f"{'  ' * s['depth']}{s['name']}" for s in timeline]
+        fig = go.Figure(go.Bar(
+            y=labels,
+            x=[s["duration_ms"] for s in timeline],
+            base=[s["start_ms"] for s in timeline],
+            orientation="h",
+            marker_color=["#be7b72" if s["depth"] == 0 else "#824d74" for s in timeline],
+            hovertemplate="%{y}<br>start %{base:.1f} ms<br>%{x:.2f} ms<extra></extra>",
+        ))
+        fig.update_layout(
+            height=max(200, 22 * len(timeline) + 80),
+            xaxis_title="ms since rerun start",
+            yaxis=dict(autorange="reversed"),
+            margin=dict(l=0, r=0, t=20, b=0),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        stats = pd.DataFrame.from_dict(cache_stats(), orient="index")
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit rate"] = ((stats["hits"] + stats["shared_hits"]) / lookups.where(lookups > 0)).map(lambda rate: f"{rate:.1%}" if rate == rate else "-")
+        st.dataframe(stats)
+        st.download_button(
+            "Download Chrome trace",
+            data=json.dumps(recorder.chrome_trace()),
+            file_name=f"nexus-{recorder.name}-{int(recorder.wall_time)}.json",
+            mime="application/json",
+        )
@@ -0,0 +1,220 @@
+import os
+import json
+import hashlib
+import datetime
+import logging
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from dataLoader import DEFAULT_CSV_PATH
+from dataCube import CUBE_DIMENSIONS, get_cube
+from liveIngest import LIVE_SOURCE, get_feed
+from kpiEngine import compute_kpis
+from graphImporte import importe_monthly_totals
+from graphRisk import risk_monthly_summary, account_age_counts, affiliation_year_range
+from riskProfile import risk_summary, seasonality_summary
+from figureCache import FigureCache, SHARED_CACHE_DIR, figure_cache, source_version
+
+logger = logging.getLogger(__name__)
+
+API_HOST = os.environ.get("NEXUS_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("NEXUS_API_PORT", "8502"))
+
+# Serialized responses shared by every client, keyed by data version and query
+# (the figure cache's bounded LRU, holding JSON bodies instead of figures)
+result_cache = FigureCache(
+    max_entries=int(os.environ.get("NEXUS_API_CACHE_ENTRIES", "1024")),
+    max_bytes=int(os.environ.get("NEXUS_API_CACHE_BYTES", str(16 * 1024 * 1024))),
+    shared_dir=SHARED_CACHE_DIR and os.path.join(SHARED_CACHE_DIR, "api"),
+)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def data_source(path=DEFAULT_CSV_PATH):
+    # The snapshot, or the live cube with every row ingested so far
+    if LIVE_SOURCE:
+        feed = get_feed(LIVE_SOURCE, path)
+        feed.poll()
+        return feed.cube
+    return path
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _year(params):
+    year = params.get("year", ["All"])[-1]
+    if year == "All":
+        return year
+    try:
+        return int(year)
+    except ValueError:
+        raise BadRequest(f"year must be an integer or 'All', not {year!r}")
+
+
+def _where(source, params):
+    # ?riskclient=0,1&medio_pago=... -> cube filter, values matched by their
+    # string form against the dimension's values. Unknown values are an error,
+    # not an empty filter.
+    where = {}
+    cube = get_cube(source)
+    for dim, values in params.items():
+        if dim not in CUBE_DIMENSIONS:
+            raise BadRequest(f"Unknown filter {dim!r}; filters are {', '.join(CUBE_DIMENSIONS)}")
+        by_text = {str(value): value for value in cube.dimension_values(dim)}
+        wanted = [value for joined in values for value in joined.split(",") if value]
+        unknown = [value for value in wanted if value not in by_text]
+        if unknown:
+            raise BadRequest(f"Unknown {dim} value(s) {', '.join(unknown)}; values are {', '.join(by_text)}")
+        where[dim] = [by_text[value] for value in wanted]
+    return where
+
+
+def importe_endpoint(source, params):
+    year = _year(params)
+    monthly = importe_monthly_totals(source, year=year)
+    quarterly = monthly.groupby('quarter')['total_importe'].mean().reset_index()
+    return {
+        "year": year,
+        "monthly_totals": _records(monthly.sort_values(['quarter', 'month'])),
+        "quarterly_monthly_average": _records(quarterly),
+    }
+
+
+def risk_endpoint(source, params):
+    year = _year(params)
+    return {"year": year, "monthly": _records(risk_monthly_summary(source, year=year))}
+
+
+def _as_of(params):
+    as_of = params.get("as_of", [None])[-1]
+    if as_of is None:
+        return datetime.date.today()
+    try:
+        return datetime.date.fromisoformat(as_of)
+    except ValueError:
+        raise BadRequest(f"as_of must be a YYYY-MM-DD date, not {as_of!r}")
+
+
+def account_age_endpoint(source, params):
+    # Distinct accounts need the raw rows, so this reads the snapshot dataset
+    default_from, default_to = affiliation_year_range(DEFAULT_CSV_PATH)
+    try:
+        year_range = (int(params.get("from", [default_from])[-1]), int(params.get("to", [default_to])[-1]))
+    except ValueError:
+        raise BadRequest("from/to must be integer years")
+    if year_range[0] > year_range[1]:
+        raise BadRequest(f"from ({year_range[0]}) must not be after to ({year_range[1]})")
+    as_of = _as_of(params)
+    counts = account_age_counts(DEFAULT_CSV_PATH, year_range=year_range, as_of=as_of)
+    counts['age_group'] = counts['age_group'].astype(str)
+    return {"year_range": list(year_range), "as_of": as_of.isoformat(), "age_groups": _records(counts)}
+
+
+def kpis_endpoint(source, params):
+    return compute_kpis(source)
+
+
+def risk_summary_endpoint(source, params):
+    as_of = _as_of(params)
+    where = _where(source, {dim: values for dim, values in params.items() if dim != "as_of"})
+    return {
+        "filters": {dim: [np.asarray(value).item() for value in values] for dim, values in where.items()},
+        "as_of": as_of.isoformat(),
+        "risk_levels": _records(risk_summary(source, where, as_of=as_of)),
+        "seasonality": _records(seasonality_summary(source, where)),
+    }
+
+
+def stats_endpoint(source, params):
+    # Hit/miss counters of this process's caches
+    return {"results": result_cache.stats(), "figures": figure_cache.stats()}
+
+
+# path -> (handler, depends on today's date unless ?as_of= is given, cached)
+ENDPOINTS = {
+    "/importe": (importe_endpoint, False, True),
+    "/risk": (risk_endpoint, False, True),
+    "/account-age": (account_age_endpoint, True, True),
+    "/kpis": (kpis_endpoint, False, True),
+    "/risk-summary": (risk_summary_endpoint, True, True),
+    "/stats": (stats_endpoint, False, False),
+}
+
+
+def query(path, params):
+    # (JSON body, ETag) for an endpoint, served from the shared result cache.
+    # The ETag is derived from the body, so it changes exactly when the data does.
+    # Uncached endpoints describe the server rather than the data: no ETag.
+    handler, daily, cached = ENDPOINTS[path]
+    if not cached:
+        return json.dumps(handler(None, params)).encode(), None
+    source = data_source()
+    key = (source_version(source), path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+    if daily and "as_of" not in params:
+        key += (datetime.date.today(),)
+    body = result_cache.get(key)
+    if body is None:
+        result = handler(source, params)
+        body = json.dumps(result, default=lambda value: np.asarray(value).item()).encode()
+        result_cache.put(key, body)
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "NexusQueryAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            return self._send(HTTPStatus.OK, b'{"status": "ok"}')
+        if url.path not in ENDPOINTS:
+            return self._send(HTTPStatus.NOT_FOUND, json.dumps({"error": f"Unknown endpoint; try {', '.join(ENDPOINTS)}"}).encode())
+        try:
+            body, etag = query(url.path, parse_qs(url.query))
+        except BadRequest as error:
+            return self._send(HTTPStatus.BAD_REQUEST, json.dumps({"error": str(error)}).encode())
+        except Exception:
+            logger.exception("Query %s failed", self.path)
+            return self._send(HTTPStatus.INTERNAL_SERVER_ERROR, b'{"error": "internal error"}')
+
+        if etag and etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            return self._send(HTTPStatus.NOT_MODIFIED, b"", etag)
+        self._send(HTTPStatus.OK, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        elif status == HTTPStatus.OK:
+            self.send_header("Cache-Control", "no-store")
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(host=API_HOST, port=API_PORT):
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    logger.info("Query API listening on http://%s:%d", host, port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    # Headless JSON API: python queryApi.py
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from dataLoader import DEFAULT_CSV_PATH, load_dataset
+from filterIndex import get_filter_index
+from affiliationDims import as_of_days, epoch_days
+
+# Rows per page offered by the raw data viewer
+PAGE_SIZES = [50, 100, 500]
+
+# Columns computed per page instead of stored: name -> (source column, descending)
+# A larger days_since_affiliation is an earlier fecha_afiliacion.
+DERIVED_COLUMNS = {"days_since_affiliation": ("fecha_afiliacion", True)}
+
+# Budget for the sort orders and sorted selections shared across sessions
+SORT_CACHE_BYTES = int(os.environ.get("NEXUS_SORT_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+_orders = OrderedDict()
+_order_bytes = 0
+_lock = threading.Lock()
+
+
+def _cached(key, build):
+    # Byte-bounded LRU of row id arrays (uint32, like the bitmap index)
+    global _order_bytes
+    with _lock:
+        if key in _orders:
+            _orders.move_to_end(key)
+            return _orders[key]
+    rows = build()
+    rows.setflags(write=False)
+    with _lock:
+        if key not in _orders:
+            _orders[key] = rows
+            _order_bytes += rows.nbytes
+            while _order_bytes > SORT_CACHE_BYTES and len(_orders) > 1:
+                _, evicted = _orders.popitem(last=False)
+                _order_bytes -= evicted.nbytes
+    return rows
+
+
+def viewer_columns(path=DEFAULT_CSV_PATH):
+    return list(load_dataset(path).columns) + list(DERIVED_COLUMNS)
+
+
+def _sort_order(path, version, column, ascending):
+    # Row positions of the whole dataset sorted by `column` (stable, missing
+    # values last), computed once per dataset version and direction
+    def build():
+        values = load_dataset(path)[column].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index
+        return order.to_numpy().astype(np.uint32)
+    return _cached((version, "order", column, ascending), build)
+
+
+def _selected_rows(path, where, sort_by, ascending):
+    # Row positions of the selection in display order. Sorting a selection is
+    # a single pass over the cached global order, not a per-selection sort.
+    filter_index = get_filter_index(path)
+    selection = filter_index.select(where)
+    where_key = tuple(sorted((dim, frozenset(values)) for dim, values in (where or {}).items()))
+    if sort_by is None:
+        return _cached((filter_index.version, "rows", where_key), lambda: filter_index.rows(selection).astype(np.uint32))
+
+    column, descending = DERIVED_COLUMNS.get(sort_by, (sort_by, False))
+    ascending = ascending != descending
+
+    def build():
+        order = _sort_order(path, filter_index.version, column, ascending)
+        mask = np.unpackbits(selection, count=filter_index.n_rows).view(bool)
+        return order[mask[order]]
+    return _cached((filter_index.version, "sorted", where_key, column, ascending), build)
+
+
+def selection_size(path=DEFAULT_CSV_PATH, where=None):
+    # (rows in the selection, rows in the dataset), from a popcount of the selection
+    filter_index = get_filter_index(path)
+    return filter_index.count(filter_index.select(where)), filter_index.n_rows
+
+
+def raw_page(path=DEFAULT_CSV_PATH, where=None, page=1, page_size=PAGE_SIZES[0], sort_by=None, ascending=True, columns=None, as_of=None):
+    # One page of the selected raw rows, sorted server-side; only the page's
+    # rows and the requested columns are materialized
+    df = load_dataset(path)
+    rows = _selected_rows(path, where, sort_by, ascending)
+    start = (max(page, 1) - 1) * page_size
+    page_rows = rows[start:start + page_size]
+
+    columns = list(columns) if columns is not None else viewer_columns(path)
+    stored = [c for c in columns if c not in DERIVED_COLUMNS]
+    needed = stored + [DERIVED_COLUMNS[c][0] for c in columns if c in DERIVED_COLUMNS and DERIVED_COLUMNS[c][0] not in stored]
+    # Rows first: only the page is copied out of the shared (mapped) frame
+    page_df = df.take(page_rows)[needed]
+    if "days_since_affiliation" in columns:
+        page_df['days_since_affiliation'] = as_of_days(as_of) - epoch_days(page_df['fecha_afiliacion'])
+    return page_df[columns]
@@ -0,0 +1,37 @@
+import os
+import sys
+import logging
+import threading
+from streamlit.web import cli
+from warmup import warm_up
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+
+# Exists only while this replica is warm; the container healthcheck (and so
+# the proxy) treats the replica as ready once it does
+READY_FILE = os.environ.get("NEXUS_READY_FILE", "/tmp/nexus-ready")
+
+logger = logging.getLogger(__name__)
+
+
+def mark_ready():
+    # A replica whose warm-up failed never becomes ready: it exits instead,
+    # so the container is restarted rather than sent traffic
+    warm_up.wait()
+    if warm_up.failed:
+        logger.error("Warm-up failed, stopping the replica")
+        os._exit(1)
+    with open(READY_FILE, "w") as fh:
+        fh.write(str(os.getpid()))
+
+
+if __name__ == "__main__":
+    # Runs `streamlit run dashboard.py` in this process with the warm-up
+    # already started, so a replica warms up before its first session instead
+    # of on it. Arguments are passed through: python replicaServer.py --server.port=8501
+    if os.path.exists(READY_FILE):
+        os.remove(READY_FILE)
+    warm_up.start()
+    threading.Thread(target=mark_ready, name="nexus-ready", daemon=True).start()
+    sys.argv = ["streamlit", "run", DASHBOARD, *sys.argv[1:]]
+    sys.exit(cli.main())
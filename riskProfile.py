@@ -0,0 +1,35 @@
+import pandas as pd
+from dataLoader import DEFAULT_CSV_PATH
+from dataCube import get_cube, mean
+from affiliationDims import as_of_days
+
+
+def risk_summary(uploaded_file=DEFAULT_CSV_PATH, where=None, as_of=None):
+    # Per risk level: loans, approval rate, average importe and delinquency
+    # figures, and average days since affiliation (as of `as_of`, default today)
+    totals = get_cube(uploaded_file).rollup(['riskclient'], where=where)
+    # Mean of (as_of - affiliation) is as_of - mean(affiliation), in days since epoch
+    today_days = as_of_days(as_of)
+    return pd.DataFrame({
+        'riskclient': totals['riskclient'],
+        'num_loans': totals['n'],
+        'approval_rate': mean(totals, 'approved'),
+        'avg_importe': mean(totals, 'total_importe'),
+        'avg_delinquencies': mean(totals, 'num_delinquencies'),
+        'ever_delinquent_rate': mean(totals, 'ever_delinquent'),
+        'days_since_affiliation': today_days - mean(totals, 'afiliacion_days'),
+    })
+
+
+def seasonality_summary(uploaded_file=DEFAULT_CSV_PATH, where=None):
+    # Per (risk level, high season flag): loans, average importe and delinquencies
+    totals = get_cube(uploaded_file).rollup(['riskclient', 'es_temporada_alta_real'], where=where)
+    seasonality = pd.DataFrame({
+        'riskclient': totals['riskclient'],
+        'es_temporada_alta_real': totals['es_temporada_alta_real'],
+        'num_loans': totals['n'],
+        'avg_importe': mean(totals, 'total_importe'),
+        'avg_delinquencies': mean(totals, 'num_delinquencies'),
+    })
+    seasonality['seasonality_label'] = seasonality['es_temporada_alta_real'].map({1: 'High', 0: 'Low'})
+    return seasonality
@@ -0,0 +1,93 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aggKernel
+from aggKernel import group_reduce
+
+
+def random_keys(rng, n_rows):
+    # One key column of each kind encode() handles, with missing values where
+    # the dtype allows them
+    categories = [f"item_{k}" for k in range(12)]
+    category = pd.Categorical(rng.choice(categories, n_rows), categories=categories)
+    category[rng.random(n_rows) < 0.05] = np.nan
+    label = pd.Series(rng.choice(["card", "cash", "loan", None], n_rows), dtype=object)
+    return {
+        "year": pd.Series(rng.integers(2019, 2026, n_rows), dtype="int16"),
+        "flag": pd.Series(rng.random(n_rows) < 0.3),
+        "category": pd.Series(category),
+        "label": label,
+        # Far wider than DENSE_BIN_LIMIT: factorized, then compacted
+        "account": pd.Series(rng.integers(0, 10**12, n_rows) // 10**8),
+    }
+
+
+def random_values(rng, n_rows):
+    return {
+        "amount": pd.Series(rng.gamma(2.0, 500.0, n_rows)),
+        "approved": pd.Series(rng.integers(0, 2, n_rows).astype("float64")),
+    }
+
+
+def normalized(frame, names):
+    # Keys as comparable text (missing -> "<NA>"), rows in key order
+    frame = frame.reset_index()
+    for name in names:
+        column = frame[name].astype(object)
+        frame[name] = column.where(column.notna(), "<NA>").astype(str)
+    return frame.sort_values(names).reset_index(drop=True)
+
+
+def expected_reduce(keys, values):
+    names = list(keys)
+    df = pd.DataFrame({**keys, **values})
+    grouped = df.groupby(names, dropna=False, observed=True)
+    return grouped.agg(n=(names[0], "size"), **{name: (name, "sum") for name in values})
+
+
+def assert_same_groups(keys, values):
+    names = list(keys)
+    actual = normalized(group_reduce(keys, values), names)
+    expected = normalized(expected_reduce(keys, values), names)
+    pd.testing.assert_frame_equal(actual[names], expected[names])
+    np.testing.assert_array_equal(actual["n"].to_numpy(), expected["n"].to_numpy())
+    for name in values:
+        np.testing.assert_allclose(actual[name].to_numpy(), expected[name].to_numpy(), rtol=1e-10)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("key_names", [
+    ["year"],
+    ["year", "flag", "category"],
+    ["category", "label"],
+    ["label", "account"],
+    ["year", "category", "label", "account"],
+])
+def test_group_reduce_matches_groupby(seed, key_names):
+    rng = np.random.default_rng(seed)
+    n_rows = int(rng.integers(1, 5_000))
+    keys = random_keys(rng, n_rows)
+    assert_same_groups({name: keys[name] for name in key_names}, random_values(rng, n_rows))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_group_reduce_compacts_sparse_bins(seed, monkeypatch):
+    # A tiny dense limit sends every multi-key reduction through np.unique
+    monkeypatch.setattr(aggKernel, "DENSE_BIN_LIMIT", 8)
+    rng = np.random.default_rng(seed)
+    n_rows = int(rng.integers(1, 5_000))
+    assert_same_groups(random_keys(rng, n_rows), random_values(rng, n_rows))
+
+
+def test_group_reduce_without_rows():
+    keys = {"year": pd.Series([], dtype="int16"), "label": pd.Series([], dtype=object)}
+    result = group_reduce(keys, {"amount": pd.Series([], dtype="float64")})
+    assert result.empty
+    assert list(result.columns) == ["n", "amount"]
+    assert list(result.index.names) == ["year", "label"]
@@ -0,0 +1,79 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from categoryDims import category_group_counts, payment_display
+
+WORDS = ["electronics", "home", "toys", "books", "garden", "sports", "beauty", "food"]
+
+
+def loop_category_group_counts(rolled):
+    # The Risk Management page's original per-group loop
+    category_by_risk = rolled[['riskclient', 'most_purchased_category', 'n']].rename(columns={'n': 'count'})
+    category_by_risk['most_purchased_category_clean'] = category_by_risk['most_purchased_category'].str.replace('item_', '', regex=False)
+    category_by_risk['category_group'] = category_by_risk['most_purchased_category_clean'].str.split('_').str[0].str.capitalize()
+    grouped = category_by_risk.groupby(['riskclient', 'category_group'], as_index=False)['count'].sum()
+
+    grouped_data = []
+    for group in grouped['category_group'].unique():
+        group_data = grouped[grouped['category_group'] == group]
+        risk_counts = group_data.groupby('riskclient')['count'].sum()
+        if all(risk_counts < 10):
+            for risk in risk_counts.index:
+                grouped_data.append({'riskclient': risk, 'category_group': 'Otros', 'count': risk_counts[risk]})
+        else:
+            grouped_data.extend(group_data.to_dict('records'))
+
+    category_by_risk_grouped = pd.DataFrame(grouped_data)
+    return category_by_risk_grouped.groupby(['riskclient', 'category_group'], as_index=False).agg({'count': 'sum'})
+
+
+def random_rollup(rng):
+    # Counts per observed (riskclient, category), like cube.rollup returns;
+    # small counts so that some groups fold into "Otros" and some do not
+    categories = [f"item_{rng.choice(WORDS)}_{k}" for k in range(int(rng.integers(1, 40)))]
+    risk_levels = list(range(int(rng.integers(1, 4))))
+    pairs = [(risk, category) for risk in risk_levels for category in categories if rng.random() < 0.6]
+    if not pairs:
+        pairs = [(risk_levels[0], categories[0])]
+    return pd.DataFrame({
+        'riskclient': [risk for risk, _ in pairs],
+        'most_purchased_category': [category for _, category in pairs],
+        'n': rng.geometric(0.15, len(pairs)).astype(np.int64),
+    })
+
+
+def in_order(frame):
+    frame = frame[['riskclient', 'category_group', 'count']].astype({'riskclient': np.int64, 'category_group': str, 'count': np.int64})
+    return frame.sort_values(['riskclient', 'category_group']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_category_group_counts_matches_loop(seed):
+    rolled = random_rollup(np.random.default_rng(seed))
+    expected = loop_category_group_counts(rolled)
+    pd.testing.assert_frame_equal(in_order(category_group_counts(rolled)), in_order(expected))
+
+
+def test_category_group_counts_from_categorical_rollup():
+    # Cube roll-ups keep most_purchased_category categorical, unused categories included
+    rolled = random_rollup(np.random.default_rng(99))
+    categorical = rolled.assign(most_purchased_category=pd.Categorical(
+        rolled['most_purchased_category'], categories=sorted(rolled['most_purchased_category'].unique()) + ["item_unused_0"],
+    ))
+    pd.testing.assert_frame_equal(in_order(category_group_counts(categorical)), in_order(loop_category_group_counts(rolled)))
+
+
+def test_category_group_counts_without_rows():
+    rolled = pd.DataFrame({'riskclient': [], 'most_purchased_category': [], 'n': []})
+    assert category_group_counts(rolled).empty
+
+
+def test_payment_display_capitalizes():
+    values = pd.Series(["cash", "loan", "cash", "card"])
+    assert list(payment_display(values)) == list(values.str.capitalize())
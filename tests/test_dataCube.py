@@ -0,0 +1,66 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import dataLoader
+import dataCube
+from liveIngest import LiveFeed
+from syntheticData import generate_csv
+
+MEASURES = ["total_importe", "num_delinquencies"]
+
+
+def expected_moments(df, by):
+    grouped = df.groupby(by)
+    return pd.DataFrame({
+        **{f"{m}_mean": grouped[m].mean() for m in MEASURES},
+        **{f"{m}_var": grouped[m].var(ddof=0) for m in MEASURES},
+        **{f"{m}_std": grouped[m].std(ddof=0) for m in MEASURES},
+    })
+
+
+def cube_moments(cube, by):
+    rolled = cube.rollup(by).set_index(by)
+    return pd.DataFrame({
+        **{f"{m}_mean": dataCube.mean(rolled, m) for m in MEASURES},
+        **{f"{m}_var": dataCube.variance(rolled, m) for m in MEASURES},
+        **{f"{m}_std": dataCube.std(rolled, m) for m in MEASURES},
+    })
+
+
+def assert_moments(cube, df, by):
+    expected = expected_moments(df, by)
+    actual = cube_moments(cube, by).loc[expected.index]
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_chunked_cube_rolls_up_variance(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEXUS_CACHE_DIR", str(tmp_path / "cache"))
+    path = generate_csv(str(tmp_path / "data.csv"), 20_000, seed=2)
+    df = pd.read_csv(path)
+
+    chunks = dataLoader.iter_chunks(path, dataCube.cube_source_columns(), 3_000)
+    cube = dataCube.build_cube(chunks)
+    assert_moments(cube, df, ["year"])
+    assert_moments(cube, df, ["year", "riskclient"])
+
+
+def test_live_feed_folds_sums_of_squares(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEXUS_CACHE_DIR", str(tmp_path / "cache"))
+    path = generate_csv(str(tmp_path / "data.csv"), 12_000, seed=3)
+    df = pd.read_csv(path)
+
+    # Snapshot holds the first rows, the event source the rest
+    base_path = str(tmp_path / "base.csv")
+    source = str(tmp_path / "events.csv")
+    df.iloc[:8_000].to_csv(base_path, index=False)
+    df.iloc[8_000:].to_csv(source, index=False)
+
+    feed = LiveFeed(source, base_path)
+    assert feed.poll() == 4_000
+    assert_moments(feed.cube, df, ["year"])
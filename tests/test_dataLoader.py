@@ -0,0 +1,30 @@
+import os
+import sys
+import numpy as np
+import pyarrow.parquet as pq
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import dataLoader
+from syntheticData import generate_csv
+
+MAPPED_COLUMNS = ["total_importe", "year", "fecha_afiliacion", "external_account_id"]
+
+
+def test_store_columns_are_mapped_views_with_many_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEXUS_CACHE_DIR", str(tmp_path / "cache"))
+    path = generate_csv(str(tmp_path / "data.csv"), 20_000, seed=1)
+
+    # Rewrite the sidecar in small row groups, as large files get them
+    sidecar = dataLoader.ensure_sidecar(path)
+    pq.write_table(pq.read_table(sidecar), sidecar, row_group_size=3_000)
+    assert pq.ParquetFile(sidecar).num_row_groups > 1
+
+    dataLoader.build_store(path)
+    dataLoader._datasets.clear()
+    df = dataLoader.load_dataset(path)
+    assert len(df) == 20_000
+    for col in MAPPED_COLUMNS:
+        assert not df[col].to_numpy().flags.writeable, col
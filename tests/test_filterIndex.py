@@ -0,0 +1,81 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from filterIndex import FILTER_DIMENSIONS, BitmapIndex
+
+CATEGORIES = [f"item_{k}" for k in range(300)]
+
+
+def random_frame(rng, n_rows):
+    # Frequent values (packed bitmaps) and a long tail of rare categories
+    # (row-id arrays); canal has missing values, so it is never skipped
+    weights = 1.0 / np.arange(1, len(CATEGORIES) + 1) ** 1.5
+    canal = pd.Series(rng.choice(["app", "web", "store"], n_rows), dtype=object)
+    canal[rng.random(n_rows) < 0.05] = None
+    return pd.DataFrame({
+        "riskclient": rng.integers(0, 2, n_rows).astype("int8"),
+        "most_purchased_category": pd.Categorical(rng.choice(CATEGORIES, n_rows, p=weights / weights.sum()), categories=CATEGORIES),
+        "medio_pago": pd.Series(rng.choice(["cash", "card", "loan", "transfer"], n_rows), dtype=object),
+        "canal": canal,
+        "es_temporada_alta_real": rng.integers(0, 2, n_rows).astype("int8"),
+    })
+
+
+def random_where(rng, df):
+    # Random subsets per dimension: none, a few, most (the inverted path) or
+    # all of the values, sometimes with a value the data does not have
+    where = {}
+    for dim in rng.permutation(FILTER_DIMENSIONS)[:int(rng.integers(1, len(FILTER_DIMENSIONS) + 1))]:
+        values = list(pd.unique(df[dim].dropna()))
+        share = rng.choice([0.0, 0.1, 0.8, 1.0])
+        chosen = [value for value in values if rng.random() < share]
+        if rng.random() < 0.2:
+            chosen.append("not_a_value")
+        where[dim] = chosen
+    return where
+
+
+def expected_rows(df, where):
+    mask = np.ones(len(df), dtype=bool)
+    for dim, values in where.items():
+        mask &= df[dim].isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_selections_match_isin_masks(seed):
+    rng = np.random.default_rng(seed)
+    # Row counts that are not multiples of 8 exercise the padding bits
+    df = random_frame(rng, int(rng.integers(3_000, 20_000)))
+    index = BitmapIndex(df)
+
+    representations = {rowset.dtype == np.uint8 for rowsets in index.rowsets.values() for rowset in rowsets}
+    assert representations == {True, False}
+
+    for _ in range(30):
+        where = random_where(rng, df)
+        bitmap = index.select(where)
+        expected = expected_rows(df, where)
+        np.testing.assert_array_equal(index.rows(bitmap), expected)
+        assert index.count(bitmap) == len(expected)
+
+
+def test_inverted_selection_keeps_missing_rows_out():
+    rng = np.random.default_rng(0)
+    df = random_frame(rng, 5_001)
+    index = BitmapIndex(df)
+    where = {"most_purchased_category": CATEGORIES[1:], "medio_pago": ["cash", "card", "loan"], "canal": ["app", "web", "store"]}
+    np.testing.assert_array_equal(index.rows(index.select(where)), expected_rows(df, where))
+
+
+def test_unfiltered_selection_is_every_row():
+    df = random_frame(np.random.default_rng(1), 1_003)
+    index = BitmapIndex(df)
+    np.testing.assert_array_equal(index.rows(index.select()), np.arange(1_003))
+    np.testing.assert_array_equal(index.rows(index.select({"riskclient": [0, 1]})), np.arange(1_003))
@@ -0,0 +1,83 @@
+import logging
+import threading
+from dataLoader import DEFAULT_CSV_PATH, STREAM_CHUNKSIZE, load_dataset
+from dataCube import get_cube
+from kpiEngine import compute_kpis
+from liveIngest import LIVE_SOURCE, get_feed
+from lazyImport import load_module
+from assetPipeline import prepare_assets
+
+logger = logging.getLogger(__name__)
+
+
+def _warmup_steps(path):
+    # (label, callable) pairs run in order; the figure arguments match the
+    # dashboard's defaults so its first render is a figure-cache hit. The chart
+    # modules are imported here, off the session thread.
+    def importe():
+        return load_module("graphImporte")
+
+    def risk():
+        return load_module("graphRisk")
+
+    steps = [
+        ("Loading dataset", lambda: load_dataset(path)),
+        ("Building aggregates", lambda: get_cube(path, chunksize=STREAM_CHUNKSIZE)),
+        ("Computing KPIs", lambda: compute_kpis(path, chunksize=STREAM_CHUNKSIZE)),
+        ("Loading chart libraries", lambda: (importe(), risk())),
+        ("Building charts", lambda: importe().get_importe_plotly_figure(path, year="All", height=500, chunksize=STREAM_CHUNKSIZE)),
+        ("Building charts", lambda: risk().get_risk_plotly_figure(path, year="All", height=500, chunksize=STREAM_CHUNKSIZE)),
+        ("Building charts", lambda: risk().get_account_age_plotly_figure_by_affiliation(path, year_range=risk().affiliation_year_range(path))),
+    ]
+    if LIVE_SOURCE:
+        steps.append(("Catching up on live data", lambda: get_feed(LIVE_SOURCE, path).poll()))
+    # Normally a manifest check: the variants are rendered with the image
+    steps.append(("Preparing images", prepare_assets))
+    return steps
+
+
+class WarmUp:
+    # Process-wide warm-up, run once in a background thread. Sessions poll its
+    # progress to drive the splash screen instead of sleeping.
+
+    def __init__(self, path=DEFAULT_CSV_PATH):
+        self.path = path
+        self.steps = _warmup_steps(path)
+        self.completed = 0
+        self.current = self.steps[0][0]
+        self.finished = threading.Event()
+        self.failed = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        return self.completed / len(self.steps)
+
+    def is_warm(self):
+        return self.finished.is_set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="nexus-warmup", daemon=True)
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def _run(self):
+        try:
+            for label, step in self.steps:
+                self.current = label
+                step()
+                self.completed += 1
+        except Exception:
+            # The page recomputes whatever is missing and surfaces the error itself
+            logger.exception("Warm-up failed at step %r", self.current)
+            self.failed = True
+        finally:
+            self.finished.set()
+
+
+warm_up = WarmUp()